@@ -0,0 +1,209 @@
+"""
+Offline microbenchmarks for the draft, hashing and seed rolling hot paths.
+
+Run from the repository root with the bot installed:
+
+    python benchmarks/run.py --output bench.json
+    python benchmarks/run.py --compare bench.json
+
+Results are written as JSON so runs on different commits can be compared.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import timeit
+from random import SystemRandom
+
+from randobot.draft import Draft
+from randobot.handler import RandoHandler
+from randobot.messages import load_messages
+from randobot.names import NamesProvider, commit_of, parse_names
+from randobot.presets import PresetWatcher, load_presets
+from randobot.seed import compute_hash, generate_seed_name
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+NAMES_FIXTURE = os.path.join(HERE, "names.txt")
+PRESETS = load_presets()
+VERSION = PRESETS.default_version
+PERMALINK = PRESETS.default_permalink
+
+
+class BenchHandler(RandoHandler):
+    """
+    RandoHandler with its outbound websocket calls stubbed out.
+    """
+
+    async def send_message(self, message, *args, **kwargs):
+        pass
+
+    async def set_raceinfo(self, info, *args, **kwargs):
+        pass
+
+
+def bench_draft():
+    options = list(PRESETS.draft.names)
+
+    def ban():
+        Draft(PRESETS.draft).ban(options[0])
+
+    def pick():
+        Draft(PRESETS.draft).pick(options[0])
+
+    def make_selection():
+        draft = Draft(PRESETS.draft)
+        draft.ban(options[0])
+        draft.pick(options[1])
+        draft.make_selection()
+
+    def guided():
+        draft = Draft(PRESETS.draft)
+        draft.start_guide(PRESETS.draft.formats[PRESETS.draft.default_format], "high", "low")
+        draft.ban(options[0])
+        draft.pick(options[1])
+        draft.guide_status()
+
+    return {
+        "draft.ban": ban,
+        "draft.pick": pick,
+        "draft.make_selection": make_selection,
+        "draft.guided": guided,
+    }
+
+
+def bench_seed(names):
+    rng = SystemRandom()
+    seed_name = generate_seed_name(rng)
+
+    return {
+        "seed.generate_name": lambda: generate_seed_name(rng),
+        "seed.compute_hash": lambda: compute_hash(seed_name, PERMALINK, VERSION, names),
+    }
+
+
+def bench_dispatch(cache_dir):
+    loop = asyncio.new_event_loop()
+    provider = NamesProvider(cache_dir=cache_dir)
+    loop.run_until_complete(provider.get(commit_of(VERSION)))
+    logger = logging.getLogger("benchmark")
+    logger.disabled = True
+    presets = PresetWatcher()
+    messages = load_messages()
+
+    def handler():
+        handler = BenchHandler(names=provider, presets=presets, messages=messages, logger=logger, conn=None, state={})
+        handler.data = {"name": "benchmark/room", "status": {"value": "open"}}
+        loop.run_until_complete(handler.begin())
+        return handler
+
+    def command(handler, text):
+        return handler.chat_message({"message": {
+            "message": text,
+            "message_plain": text,
+            "is_monitor": True,
+            "user": {"id": "benchmark", "name": "benchmark"},
+        }})
+
+    def run(*commands):
+        def fn():
+            h = handler()
+            for text in commands:
+                loop.run_until_complete(command(h, text))
+        return fn
+
+    return {
+        "dispatch.info": run("!info"),
+        "dispatch.info_french": run("!francais", "!info"),
+        "dispatch.rollseed": run("!rollseed"),
+        "dispatch.draft_rollseed": run("!draft", "!ban 3D Open", "!pick 2D Cubes", "!rollseed"),
+    }
+
+
+def measure(fn, repeat, min_time):
+    number = 1
+    while True:
+        elapsed = timeit.timeit(fn, number=number)
+        if elapsed >= min_time:
+            break
+        number *= 2
+    timings = [t / number for t in timeit.repeat(fn, number=number, repeat=repeat)]
+    return {
+        "number": number,
+        "min_us": min(timings) * 1e6,
+        "median_us": statistics.median(timings) * 1e6,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=HERE, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old, new):
+    for name, result in new["results"].items():
+        before = old["results"].get(name)
+        if before is None:
+            print(f"{name:32} {result['min_us']:12.2f} us   (new)")
+            continue
+        change = (result["min_us"] - before["min_us"]) / before["min_us"] * 100
+        print(f"{name:32} {result['min_us']:12.2f} us   {change:+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SS RandoBot benchmarks")
+    parser.add_argument("--output", "-o", type=str, help="write results as JSON to this file")
+    parser.add_argument("--compare", type=str, help="compare against a previous results file")
+    parser.add_argument("--filter", "-k", type=str, help="only run benchmarks containing this string")
+    parser.add_argument("--repeat", type=int, default=5, help="timing repetitions per benchmark")
+    parser.add_argument("--min-time", type=float, default=0.05, help="minimum seconds per repetition")
+
+    args = parser.parse_args()
+
+    with open(NAMES_FIXTURE, encoding="utf-8") as f:
+        names = parse_names(f.read())
+
+    cache_dir = tempfile.mkdtemp(prefix="randobot-bench-")
+    try:
+        shutil.copy(NAMES_FIXTURE, os.path.join(cache_dir, f"{commit_of(VERSION)}.txt"))
+        benchmarks = {
+            **bench_draft(),
+            **bench_seed(names),
+            **bench_dispatch(cache_dir),
+        }
+        results = {}
+        for name, fn in benchmarks.items():
+            if args.filter and args.filter not in name:
+                continue
+            results[name] = measure(fn, args.repeat, args.min_time)
+            print(f"{name:32} {results[name]['min_us']:12.2f} us")
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print()
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
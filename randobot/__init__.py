@@ -1,8 +1,79 @@
 import argparse
-import logging
-import sys
+import os
 
 from .bot import RandoBot
+from .logs import setup_logging
+from .versions import GITHUB_API
+
+
+def add_bot_arguments(parser):
+    parser.add_argument("--verbose", "-v", action="store_true", help="verbose output")
+    parser.add_argument("--host", type=str, nargs="?", help="change the ractime.gg host (debug only!")
+    parser.add_argument("--cache-dir", type=str, help="directory for cached names lists")
+    parser.add_argument("--manifest", type=str, help="manifest of pre-rolled seeds to claim from")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on this port")
+    parser.add_argument("--metrics-host", type=str, default="127.0.0.1", help="address for the metrics endpoint")
+    parser.add_argument("--send-interval", type=float, default=0.2, help="minimum seconds between messages to a room")
+    parser.add_argument("--no-coalesce", action="store_true",
+                        help="send every chat message on its own instead of joining queued ones with line breaks")
+    parser.add_argument("--state-db", type=str, help="SQLite file to persist room state across restarts")
+    parser.add_argument("--history-db", type=str, help="SQLite file indexing every rolled seed, to avoid repeats")
+    parser.add_argument("--room-ttl", type=float, default=3600, help="seconds to keep the state of rooms the bot left")
+    parser.add_argument("--max-rooms", type=int, default=1000, help="rooms whose state is kept in memory at most")
+    parser.add_argument("--presets", type=str, help="JSON file of versions, presets and draft options, reloaded on change")
+    parser.add_argument("--pool-size", type=int, default=3, help="pre-rolled seeds kept per preset (0 disables)")
+    parser.add_argument("--pool-low-water", type=int, default=1, help="refill a preset's seeds when down to this many")
+    parser.add_argument("--spoiler-command", type=str,
+                        help="command generating a spoiler log, formatted with {version}, {commit}, {permalink}, {seed} and {output}")
+    parser.add_argument("--spoiler-dir", type=str, help="directory where spoiler logs are stored")
+    parser.add_argument("--spoiler-url", type=str, help="public URL the spoiler log directory is served from")
+    parser.add_argument("--spoiler-workers", type=int, default=2, help="spoiler logs generated at the same time")
+    parser.add_argument("--audit-log", type=str, help="file for the JSON lines audit log of rolls, draft and room changes")
+    parser.add_argument("--github-api", type=str, default=GITHUB_API, help="GitHub API URL used to resolve versions")
+    parser.add_argument("--github-token", type=str, default=os.environ.get("GITHUB_TOKEN"),
+                        help="GitHub token for version lookups (defaults to $GITHUB_TOKEN)")
+    parser.add_argument("--insecure", action="store_true", help="don\"t use HTTPS (debug only!)")
+
+
+def check_bot_arguments(parser, args):
+    # without a public URL the bot would post a path on this machine as the log link
+    if args.spoiler_command and not args.spoiler_url:
+        parser.error("--spoiler-command needs --spoiler-url")
+
+
+def configure_host(host, insecure):
+    if host:
+        RandoBot.racetime_host = host
+    if insecure:
+        RandoBot.racetime_secure = False
+
+
+def bot_kwargs(args):
+    """
+    Return the RandoBot keyword arguments for the options added by
+    `add_bot_arguments`.
+    """
+    return {
+        "cache_dir": args.cache_dir,
+        "manifest": args.manifest,
+        "metrics_host": args.metrics_host,
+        "metrics_port": args.metrics_port,
+        "send_interval": args.send_interval,
+        "coalesce_messages": not args.no_coalesce,
+        "state_db": args.state_db,
+        "history_db": args.history_db,
+        "room_ttl": args.room_ttl,
+        "max_rooms": args.max_rooms,
+        "presets": args.presets,
+        "pool_size": args.pool_size,
+        "pool_low_water": args.pool_low_water,
+        "spoiler_command": args.spoiler_command,
+        "spoiler_dir": args.spoiler_dir,
+        "spoiler_url": args.spoiler_url,
+        "spoiler_workers": args.spoiler_workers,
+        "github_api": args.github_api,
+        "github_token": args.github_token,
+    }
 
 
 def main():
@@ -12,37 +83,23 @@ def main():
     parser.add_argument("category_slug", type=str, help="racetime.gg category")
     parser.add_argument("client_id", type=str, help="racetime.gg client ID")
     parser.add_argument("client_secret", type=str, help="racetime.gg client secret")
-    parser.add_argument("--verbose", "-v", action="store_true", help="verbose output")
-    parser.add_argument("--host", type=str, nargs="?", help="change the ractime.gg host (debug only!")
-    parser.add_argument("--insecure", action="store_true", help="don\"t use HTTPS (debug only!)")
+    add_bot_arguments(parser)
 
     args = parser.parse_args()
+    check_bot_arguments(parser, args)
 
-    logger = logging.getLogger()
-    handler = logging.StreamHandler(sys.stdout)
-
-    if args.verbose:
-        logger.setLevel(logging.DEBUG)
-        handler.setLevel(logging.DEBUG)
-
-    handler.setFormatter(logging.Formatter(
-        "[%(asctime)s] %(name)s (%(levelname)s) :: %(message)s"
-    ))
-    logger.addHandler(handler)
-
-    if args.host:
-        RandoBot.racetime_host = args.host
-    if args.insecure:
-        RandoBot.racetime_secure = False
+    logger = setup_logging(args.verbose, args.audit_log)
+    configure_host(args.host, args.insecure)
 
     inst = RandoBot(
         category_slug=args.category_slug,
         client_id=args.client_id,
         client_secret=args.client_secret,
         logger=logger,
+        **bot_kwargs(args),
     )
     inst.run()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
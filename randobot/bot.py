@@ -1,6 +1,23 @@
+import asyncio
+import json
+from functools import partial
+
+import aiohttp
 from racetime_bot import Bot
 
+from . import metrics
 from .handler import RandoHandler
+from .history import SeedHistory
+from .messages import load_messages
+from .names import NamesProvider
+from .pool import SeedPool
+from .preroll import SeedManifest
+from .presets import DEFAULT_PRESETS_PATH, PresetWatcher
+from .registry import RoomRegistry
+from .sharding import HashRing
+from .spoiler import ArtifactStore, SpoilerLogService
+from .store import StateStore
+from .versions import GITHUB_API, VersionResolver
 
 
 class RandoBot(Bot):
@@ -8,13 +25,180 @@ class RandoBot(Bot):
     RandoBot base class.
     """
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, cache_dir=None, manifest=None,
+                 metrics_host="127.0.0.1", metrics_port=None, send_interval=0.2, coalesce_messages=True,
+                 state_db=None, pool_size=3, pool_low_water=1, spoiler_command=None,
+                 spoiler_dir=None, spoiler_url=None, spoiler_workers=2, github_api=GITHUB_API,
+                 github_token=None, room_ttl=3600, max_rooms=1000, presets=None, history_db=None, shard=None,
+                 **kwargs):
         super().__init__(*args, **kwargs)
+        self.state = RoomRegistry(ttl=room_ttl, max_rooms=max_rooms, logger=self.logger)
+        # only a preset file given on the command line is watched for changes
+        self.watch_presets = presets is not None
+        self.presets = PresetWatcher(presets or DEFAULT_PRESETS_PATH, logger=self.logger)
+        self.presets.subscribe(self.presets_changed)
+        self.messages = load_messages()
+        # (index, count) of this process when rooms are split across workers
+        self.shard = shard
+        self.ring = HashRing(range(shard[1])) if shard else None
+        self.store = None
+        if state_db:
+            self.store = StateStore(state_db, presets=self.presets, logger=self.logger)
+            self.state.update(self.store.load_all())
+            self.logger.info(f"Restored state for {len(self.state)} rooms")
+        self.history = SeedHistory(history_db, logger=self.logger) if history_db else None
+        self.send_interval = send_interval
+        self.coalesce_messages = coalesce_messages
+        self.metrics_host = metrics_host
+        self.metrics_port = metrics_port
+        self.names = NamesProvider(cache_dir=cache_dir, logger=self.logger)
+        self.versions = VersionResolver(
+            aliases=self.presets.current.versions,
+            api_url=github_api,
+            token=github_token,
+            logger=self.logger,
+        )
+        # a manifest object may be shared by several bots in one process
+        self.manifest = SeedManifest(manifest) if isinstance(manifest, str) else manifest
+        self.spoilers = None
+        if spoiler_command:
+            self.spoilers = SpoilerLogService(
+                spoiler_command,
+                ArtifactStore(spoiler_dir or "spoilers", url_base=spoiler_url),
+                max_workers=spoiler_workers,
+                logger=self.logger,
+            )
+        self.pool = None
+        if pool_size > 0:
+            self.pool = SeedPool(
+                self.names,
+                self.presets.current.pool_configs(),
+                size=pool_size,
+                low_water=min(pool_low_water, pool_size - 1),
+                logger=self.logger,
+            )
 
     def get_handler_class(self):
         return RandoHandler
 
     def get_handler_kwargs(self, *args, **kwargs):
         return {
-            **super().get_handler_kwargs(*args, **kwargs)
+            **super().get_handler_kwargs(*args, **kwargs),
+            "names": self.names,
+            "presets": self.presets,
+            "messages": self.messages,
+            "versions": self.versions,
+            "manifest": self.manifest,
+            "pool": self.pool,
+            "send_interval": self.send_interval,
+            "coalesce_messages": self.coalesce_messages,
+            "store": self.store,
+            "history": self.history,
+            "spoilers": self.spoilers,
         }
+
+    def presets_changed(self, presets):
+        """
+        Rebuild what is derived from the presets after a reload.
+        """
+        self.versions.set_aliases(presets.versions)
+        if self.pool is not None:
+            self.pool.set_configs(presets.pool_configs())
+        self.loop.create_task(self.names.preload(presets.commits()))
+
+    def create_handler(self, race_data):
+        handler = super().create_handler(race_data)
+        self.state.attach(race_data.get("name"), handler)
+        return handler
+
+    def in_shard(self, name):
+        return self.ring is None or self.ring.shard_for(name) == self.shard[0]
+
+    async def refresh_races(self):
+        """
+        As `Bot.refresh_races`, except that races of other shards are
+        skipped by name from the category listing, before their race data
+        is fetched.
+        """
+        def done(task_name, *args):
+            del self.handlers[task_name]
+
+        while True:
+            self.logger.info("Refresh races")
+            try:
+                async with aiohttp.request(
+                    method="get",
+                    url=self.http_uri(f"/{self.category_slug}/data"),
+                    raise_for_status=True,
+                ) as resp:
+                    data = json.loads(await resp.read())
+            except Exception:
+                self.logger.error("Fatal error when attempting to retrieve race data.", exc_info=True)
+                await asyncio.sleep(self.scan_races_every)
+                continue
+            self.races = {}
+            for race in data.get("current_races", []):
+                self.races[race.get("name")] = race
+
+            for name, summary_data in self.races.items():
+                if name in self.handlers or not self.in_shard(name):
+                    continue
+                try:
+                    async with aiohttp.request(
+                        method="get",
+                        url=self.http_uri(summary_data.get("data_url")),
+                        raise_for_status=True,
+                    ) as resp:
+                        race_data = json.loads(await resp.read())
+                except Exception:
+                    self.logger.error("Fatal error when attempting to retrieve summary data.", exc_info=True)
+                    await asyncio.sleep(self.scan_races_every)
+                    continue
+                if self.should_handle(race_data):
+                    handler = self.create_handler(race_data)
+                    self.handlers[name] = self.loop.create_task(handler.handle())
+                    self.handlers[name].add_done_callback(partial(done, name))
+                else:
+                    if name in self.state:
+                        del self.state[name]
+                    self.logger.info(f"Ignoring {name} by configuration.")
+
+            await asyncio.sleep(self.scan_races_every)
+
+    def start(self):
+        """
+        Schedule the bot's tasks on its event loop without running the loop,
+        so several bots can share one loop.
+        """
+        self.loop.create_task(self.names.preload(self.presets.current.commits()))
+        if self.watch_presets:
+            self.loop.create_task(self.presets.run())
+        if self.metrics_port:
+            self.loop.run_until_complete(metrics.serve(self.metrics_host, self.metrics_port))
+            self.loop.create_task(metrics.monitor_loop_lag())
+            self.logger.info(f"Serving metrics on http://{self.metrics_host}:{self.metrics_port}/metrics")
+        if self.pool is not None:
+            self.loop.create_task(self.pool.run())
+        if self.store is not None:
+            self.loop.create_task(self.store.run())
+        if self.history is not None:
+            self.loop.create_task(self.history.run())
+        self.loop.create_task(self.state.run(self.handlers))
+        self.loop.create_task(self.reauthorize())
+        self.loop.create_task(self.refresh_races())
+        self.loop.set_exception_handler(self.handle_exception)
+
+    def close(self):
+        if self.spoilers is not None:
+            self.loop.run_until_complete(self.spoilers.close())
+        if self.store is not None:
+            self.store.close()
+        if self.history is not None:
+            self.history.close()
+
+    def run(self):
+        self.start()
+        try:
+            self.loop.run_forever()
+        finally:
+            self.close()
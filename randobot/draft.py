@@ -1,103 +1,408 @@
+from fractions import Fraction
+from functools import lru_cache
 from random import SystemRandom
 
+from .permalink import with_setting
+
+
+def normalize(name):
+    return " ".join(name.lower().replace("-", " ").replace("_", " ").split())
+
+
+def build_lookup(names, aliases):
+    """
+    Map every normalized name and alias to its option index, and every
+    prefix of those to the set of option indexes it could mean.
+    """
+    exact = {}
+    prefixes = {}
+    for index, name in enumerate(names):
+        for key in (name,) + tuple(aliases.get(name, ())):
+            key = normalize(key)
+            exact[key] = index
+            for end in range(1, len(key) + 1):
+                prefixes.setdefault(key[:end], set()).add(index)
+    return exact, {prefix: frozenset(indexes) for prefix, indexes in prefixes.items()}
+
+
+@lru_cache(maxsize=None)
+def build_odds_table(option_count):
+    """
+    Exact selection odds for every draft state with `option_count` options.
+
+    `make_selection` adds one of the `available` (neither banned nor picked)
+    options to the `picked` ones, uniformly, then chooses uniformly from that
+    pool. So every picked option has odds 1 / pool and every available one
+    1 / (pool * available). Maps (picked, available) to those two odds.
+    """
+    table = {}
+    for picked in range(option_count + 1):
+        for available in range(option_count - picked + 1):
+            pool = picked + (1 if available else 0)
+            if pool == 0:
+                table[(picked, available)] = (Fraction(0), Fraction(0))
+            elif available == 0:
+                table[(picked, available)] = (Fraction(1, pool), Fraction(0))
+            else:
+                table[(picked, available)] = (Fraction(1, pool), Fraction(1, pool * available))
+    return table
+
+
+def format_odds(odds):
+    return ", ".join(f"{name}: {float(chance):.1%}" for name, chance in odds)
+
+
+BAN = "ban"
+PICK = "pick"
+ROLES = ("high", "low")
+
+# used when a preset file declares no formats: the original 1v1 order
+DEFAULT_FORMATS = {
+    "1v1": {"label": "1v1", "games": [["low ban", "high pick", "high ban", "low pick"]]},
+}
+
+# chat messages for a ban or pick: accepted, unknown option, already banned, already picked
+RESULTS = {
+    BAN: ("draft_banned", "draft_ban_unknown", "draft_ban_banned", "draft_ban_picked"),
+    PICK: ("draft_picked", "draft_pick_unknown", "draft_pick_banned", "draft_pick_picked"),
+}
+
+
+class DraftFormat:
+    """
+    A guided draft order, compiled from its declaration into tables
+    indexed by step.
+
+    The steps of every game are numbered in one sequence, followed by one
+    more step meaning the draft is over. For each step the tables hold the
+    action it expects, the role of the player taking it, the step that
+    comes next and the messages to send, so checking a turn and prompting
+    the next player are tuple lookups.
+    """
+
+    __slots__ = ("name", "label", "starts", "done", "actions", "roles", "following", "prompts", "statuses",
+                 "rejections")
+
+    def __init__(self, name, label, games):
+        if not isinstance(games, list) or not games:
+            raise ValueError(f"Draft format {name!r} needs a list of games")
+        actions = []
+        roles = []
+        starts = []
+        for game in games:
+            if not isinstance(game, list) or not game:
+                raise ValueError(f"Draft format {name!r} has a game without steps")
+            starts.append(len(actions))
+            for step in game:
+                role, _, action = str(step).partition(" ")
+                if role not in ROLES or action not in (BAN, PICK):
+                    raise ValueError(f"Draft format {name!r}: steps must be '<high|low> <ban|pick>', got {step!r}")
+                actions.append(action)
+                roles.append(role)
+        self.name = name
+        self.label = label
+        self.starts = tuple(starts)
+        self.done = done = len(actions)
+        # each game ends the draft, the next one starts in another room
+        ends = set(start - 1 for start in starts[1:]) | {done - 1}
+        self.following = tuple(done if step in ends else step + 1 for step in range(done)) + (done,)
+        self.actions = tuple(actions) + (None,)
+        self.roles = tuple(roles) + (None,)
+        self.prompts = tuple(
+            {BAN: "draft_prompt_ban", PICK: "draft_prompt_pick"}.get(action, "draft_prompt_roll")
+            for action in self.actions
+        )
+        self.statuses = tuple(
+            {BAN: "draft_next_ban", PICK: "draft_next_pick"}.get(action, "draft_next_roll")
+            for action in self.actions
+        )
+        self.rejections = tuple(
+            {BAN: "draft_expect_ban", PICK: "draft_expect_pick"}.get(action, "draft_guide_done")
+            for action in self.actions
+        )
+
+    @property
+    def games(self):
+        return len(self.starts)
+
+
+def parse_formats(data):
+    """
+    Compile the `formats` of the draft section of the preset file: a
+    mapping of format names to `{"label": ..., "games": [[step, ...], ...]}`
+    where each step is "high ban", "low pick" and so on. Returns {name:
+    DraftFormat}.
+    """
+    if not isinstance(data, dict) or not data:
+        raise ValueError("'formats' must map format names to their games")
+    formats = {}
+    for name, entry in data.items():
+        if not isinstance(entry, dict):
+            raise ValueError(f"Draft format {name!r} must be an object")
+        formats[name.lower()] = DraftFormat(name.lower(), entry.get("label", name), entry.get("games"))
+    return formats
+
+
+def remap_mask(mask, names, options):
+    """
+    Move the bits of `mask`, indexed by `names`, to the positions of the
+    same names in `options`, dropping names it no longer has.
+    """
+    positions = {name: index for index, name in enumerate(options.names)}
+    remapped = 0
+    for index, name in enumerate(names):
+        if mask >> index & 1 and name in positions:
+            remapped |= 1 << positions[name]
+    return remapped
+
+
+class DraftOptions:
+    """
+    The options a draft chooses from, with everything derived from them:
+    spoiler-off permalinks, name lookups and odds tables, and the compiled
+    formats a draft can be guided through.
+
+    Built once per preset configuration and shared, read-only, by every
+    draft started with it.
+    """
+
+    __slots__ = ("options", "no_spoiler_options", "aliases", "names", "exact_lookup", "prefix_lookup", "odds",
+                 "formats", "default_format")
+
+    def __init__(self, options, aliases=None, formats=None, default_format=None):
+        self.options = dict(options)
+        self.no_spoiler_options = {
+            name: with_setting(permalink, "no-spoiler-log", 1)
+            for name, permalink in self.options.items()
+        }
+        self.aliases = {name: tuple(names) for name, names in (aliases or {}).items()}
+        self.names = tuple(self.options)
+        self.exact_lookup, self.prefix_lookup = build_lookup(self.names, self.aliases)
+        self.odds = build_odds_table(len(self.names))
+        self.formats = formats or parse_formats(DEFAULT_FORMATS)
+        self.default_format = default_format or next(iter(self.formats))
+
+    def lookup(self, option):
+        """
+        Return the index of the option named by `option`, or None if it
+        matches no option or more than one.
+        """
+        key = normalize(option)
+        if key in self.exact_lookup:
+            return self.exact_lookup[key]
+        matches = self.prefix_lookup.get(key, ())
+        if len(matches) == 1:
+            return next(iter(matches))
+        return None
+
 
 class Draft:
+    """
+    Ban/pick state of a draft.
+
+    Bans and picks are bitmasks over the index of `options`, and a guided
+    draft adds its format, shared with every other draft, and a step
+    number into the format's tables. So a draft is a handful of small
+    values that can be copied or stored cheaply.
+
+    Bans, picks and the guide return the chat message to send as (message
+    ID or tuple of IDs, fields), see `MessageCatalog.render`.
+    """
 
-    OPTIONS = {
-        "3D Standard": "oQ0AIDADo5oJUgAAAAAAAAAYFA==",
-        "3D EUD Off": "oQUAIDADo5oJUgAAAAAAAAAcGA==",
-        "2D Cubes": "IQ0AIBADo5oJUgAAAAAAAAAYEA==",
-        "3D Keysanity": "oQ0AIDADo5oJmgAAAAAAAAAYFA==",
-        "3D Swordless": "gQ0AIDADo5oJUgAAAAAAAAAcFA==",
-        "3D Open": "pw0AADADo5oJUgAAAAAAAAAYFA==",
-    }
-
-    def __init__(self) -> None:
-        self.all_options = self.OPTIONS.keys()
-        self.banned = []
-        self.picked = []
-        self.random = SystemRandom()
+    random = SystemRandom()
+
+    __slots__ = ("options", "banned_mask", "picked_mask", "spoiler_log", "high_seed", "low_seed", "guide_format",
+                 "guide_step")
+
+    def __init__(self, options) -> None:
+        self.options = options
+        self.banned_mask = 0
+        self.picked_mask = 0
 
         self.spoiler_log = True
         self.high_seed = ""
         self.low_seed = ""
+        self.guide_format = None
         self.guide_step = None
 
+    @property
+    def banned(self):
+        return self._names(self.banned_mask)
+
+    @property
+    def picked(self):
+        return self._names(self.picked_mask)
+
+    def _names(self, mask):
+        return [name for index, name in enumerate(self.options.names) if mask >> index & 1]
+
+    def _player(self, role):
+        if role is None:
+            return None
+        return self.high_seed if role == "high" else self.low_seed
+
     def ban(self, option):
-        if (self.guide_step is not None) and (self.guide_step % 2 == 1):
-            # the current step in the guide expects a player to pick an option
-            return "Currently, a player should be picking an option, not banning one."
-        if option in self.banned:
-            # option cannot be banned twice
-            return f"Unable to ban option {option} - it has already been banned"
-        if option in self.picked:
-            # option cannot be banned once picked
-            return f"Unable to ban option {option} - it has already been picked"
-        if option not in self.all_options:
-            # invalid choice
-            return f"Unable to ban option {option} - invalid option"
-        self.banned.append(option)
-        return_string = f"Banned {option}"
-        if self.guide_step == 0:
-            return_string += f". {self.high_seed}, please pick an option."
-            self.guide_step += 1
-        elif self.guide_step == 2:
-            return_string += f". {self.low_seed}, please pick an option."
-            self.guide_step += 1
-        return return_string
+        return self._take(option, BAN)
 
     def pick(self, option):
-        if (self.guide_step is not None) and (self.guide_step % 2 == 0):
-            # the current step in the guide expects a player to ban an option
-            return "Currently, a player should be banning an option, not picking one."
-        if option in self.banned:
-            # option cannot be picked if banned
-            return f"Unable to pick option {option} - it has already been banned"
-        if option in self.picked:
-            # option cannot be picked twice
-            return f"Unable to pick option {option} - it has already been picked"
-        if option not in self.all_options:
-            # invalid choice
-            return f"Unable to pick option {option} - invalid option"
-        self.picked.append(option)
-        return_string = f"Picked {option}"
-        if self.guide_step == 1:
-            return_string += f". {self.high_seed}, please ban an option."
-            self.guide_step += 1
-        elif self.guide_step == 3:
-            return_string += f". When everyone is ready, have someone use !rollseed to roll the seed. I will choose one unbanned option to add to the pool as well, and then select one option from the pool."
-        return return_string
+        return self._take(option, PICK)
+
+    def _take(self, option, action):
+        step = self.guide_step
+        guide = self.guide_format
+        if step is not None and guide.actions[step] != action:
+            # the guide expects the other action, or the draft is over
+            return (guide.rejections[step], {})
+        accepted, unknown, banned, picked = RESULTS[action]
+        index = self.options.lookup(option)
+        if index is None:
+            return (unknown, {"option": option})
+        option = self.options.names[index]
+        if self.banned_mask >> index & 1:
+            return (banned, {"option": option})
+        if self.picked_mask >> index & 1:
+            return (picked, {"option": option})
+        if action == BAN:
+            self.banned_mask |= 1 << index
+        else:
+            self.picked_mask |= 1 << index
+        if step is None:
+            return (accepted, {"option": option})
+        self.guide_step = step = guide.following[step]
+        return ((accepted, guide.prompts[step]), {"option": option, "player": self._player(guide.roles[step])})
+
+    def clear(self):
+        self.banned_mask = 0
+        self.picked_mask = 0
 
     def set_log_state(self, option):
         if option == "off":
             self.spoiler_log = False
-            return "Spoiler log generation is now turned OFF."
+            return ("draftlog_off", {})
         elif option == "on":
             self.spoiler_log = True
-            return "Spoiler log generation is now turned ON."
+            return ("draftlog_on", {})
         else:
-            return "Invalid argument. Please specify 'off' to turn off the spoiler log or 'on' to turn it on."
+            return ("draftlog_invalid", {})
 
-    def seeding_init(self, high_seed, low_seed):
+    def start_guide(self, guide_format, high_seed, low_seed, game=1):
+        """
+        Guide the draft through game `game` (from 1) of `guide_format`.
+        """
         self.high_seed, self.low_seed = high_seed, low_seed
-        self.guide_step = 0
-        return f"Draft guide has been enabled. Note that this means picks and bans will only go through if chosen in the correct order. Please disable guide mode to fully unlock. {self.high_seed}, you have been set as the higher seed, and {self.low_seed}, you have been set as the lower seed. {self.low_seed}, please ban an option."
+        self.guide_format = guide_format
+        self.guide_step = step = guide_format.starts[game - 1]
+        message = ("draftguide_on", "draftguide_game") if guide_format.games > 1 else ("draftguide_on",)
+        return (
+            message + ("draftguide_rules", guide_format.prompts[step]),
+            {
+                "format": guide_format.label,
+                "game": game,
+                "games": guide_format.games,
+                "high": high_seed,
+                "low": low_seed,
+                "player": self._player(guide_format.roles[step]),
+            },
+        )
+
+    def stop_guide(self):
+        self.guide_format = None
+        self.guide_step = None
+
+    def guide_status(self):
+        """
+        Return the status message of the next guided step as (message ID,
+        player), or None if the draft is not guided.
+        """
+        if self.guide_step is None:
+            return None
+        guide = self.guide_format
+        return (guide.statuses[self.guide_step], self._player(guide.roles[self.guide_step]))
 
     def make_selection(self):
-        possible_selections = self.picked
-        possible_selections.append(self.random.choice([
-            option for option in self.OPTIONS
-            if option not in self.banned and option not in self.picked
-        ]))
-        choice = self.random.choice(possible_selections)
-
-        perma = self.OPTIONS[choice]
-        # the ninth character of every permalink in the draft options is 'o' when spoiler log if on, but '4' when spoiler log if off
-        if not self.spoiler_log:
-            perma = ""
-            for n, c in enumerate(self.OPTIONS[choice]):
-                if n == 8:
-                    perma += "4"
-                else:
-                    perma += c
-        return (choice, perma)
+        """
+        Pick the option to play without changing the draft: one random
+        option that is neither banned nor picked joins the picks, and one
+        option is chosen from that pool.
+        """
+        names = self.options.names
+        taken = self.banned_mask | self.picked_mask
+        pool = [index for index in range(len(names)) if self.picked_mask >> index & 1]
+        available = [index for index in range(len(names)) if not taken >> index & 1]
+        if available:
+            pool.append(self.random.choice(available))
+        choice = names[self.random.choice(pool)]
+
+        if self.spoiler_log:
+            return (choice, self.options.options[choice])
+        return (choice, self.options.no_spoiler_options[choice])
+
+    def odds(self):
+        """
+        Return (option, probability) pairs for the option `make_selection`
+        would choose in the current state.
+        """
+        taken = self.banned_mask | self.picked_mask
+        picked = bin(self.picked_mask).count("1")
+        available = len(self.options.names) - bin(taken).count("1")
+        picked_odds, available_odds = self.options.odds[(picked, available)]
+        odds = []
+        for index, name in enumerate(self.options.names):
+            if self.picked_mask >> index & 1:
+                odds.append((name, picked_odds))
+            elif self.banned_mask >> index & 1:
+                odds.append((name, Fraction(0)))
+            else:
+                odds.append((name, available_odds))
+        return odds
+
+    def to_state(self):
+        """
+        Return the draft as a tuple of plain values, see `from_state`. The
+        options are not included and the format is named.
+        """
+        return (
+            self.banned_mask,
+            self.picked_mask,
+            self.spoiler_log,
+            self.high_seed,
+            self.low_seed,
+            self.guide_format.name if self.guide_step is not None else None,
+            self.guide_step,
+        )
+
+    @classmethod
+    def from_state(cls, state, options, names=None):
+        """
+        Rebuild a draft from `to_state`, looking its format up in
+        `options`. A draft whose format is no longer there, or no longer
+        has its step, is restored unguided.
+
+        `names` are the option names the draft was saved with, if known.
+        When the options have changed since, bans and picks are moved to
+        the options' new positions and those of removed options dropped.
+        """
+        if len(state) == 6:
+            # stored before formats, guided through the original 1v1 order
+            state = state[:5] + ("1v1" if state[5] is not None else None, state[5])
+        draft = cls.__new__(cls)
+        draft.options = options
+        (
+            draft.banned_mask,
+            draft.picked_mask,
+            draft.spoiler_log,
+            draft.high_seed,
+            draft.low_seed,
+            name,
+            draft.guide_step,
+        ) = state
+        if names is not None and tuple(names) != options.names:
+            draft.banned_mask = remap_mask(draft.banned_mask, names, options)
+            draft.picked_mask = remap_mask(draft.picked_mask, names, options)
+        draft.guide_format = options.formats.get(name) if name is not None else None
+        if draft.guide_format is None or draft.guide_step is None or not 0 <= draft.guide_step <= draft.guide_format.done:
+            draft.stop_guide()
+        return draft
+
+    def copy(self):
+        return self.from_state(self.to_state(), self.options)
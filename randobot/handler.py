@@ -1,125 +1,183 @@
 import asyncio
+import time
 from datetime import datetime, timedelta
 from racetime_bot import RaceHandler, monitor_cmd, can_monitor
-import random
 from random import SystemRandom
-import hashlib
-import urllib.request
-import string
 
-from randobot.draft import Draft
+from randobot.draft import Draft, format_odds
+from randobot.logs import audit
+from randobot.messages import BILINGUAL, ENGLISH, load_messages
+from randobot.metrics import ACTIVE_HANDLERS, COMMAND_LATENCY, COMMANDS_THROTTLED, ROLLS
+from randobot.names import NamesUnavailable, commit_of
+from randobot.outbox import Outbox
+from randobot.permalink import is_valid
+from randobot.presets import PresetWatcher
+from randobot.seed import compute_hash, full_permalink, generate_seed_name
+from randobot.spoiler import SpoilerLogError
+from randobot.throttle import ALLOW, REPLY, Throttle
+from randobot.versions import VersionResolver, VersionUnknown
 
 
 class RandoHandler(RaceHandler):
     stop_at = ["cancelled", "finished"]
 
-    STANDARD_RACE_PERMALINK = "IQwAACADspoBUgAAAAAAABCK2CA="
-    STANDARD_SPOILER_RACE_PERMALINK = "IwUAAAAAwsXwJQAAAAAAgAAAAAA="
+    # shared by every handler
+    random = SystemRandom()
 
-    def __init__(self, **kwargs):
+    # commands changing the room's settings, run one at a time per room
+    STATE_COMMANDS = frozenset({
+        "reset", "permalink", "version", "preset", "sgl", "coop", "s2", "spoiler", "lock", "unlock",
+        "draft", "draftoff", "ban", "pick", "draftlog", "draftguide", "draftguideoff",
+    })
+
+    def __init__(self, names, presets=None, messages=None, versions=None, manifest=None, pool=None, store=None,
+                 spoilers=None, history=None, send_interval=0.2, coalesce_messages=True, **kwargs):
         super().__init__(**kwargs)
 
-        self.loop = asyncio.get_event_loop()
-        self.loop_ended = False
-        self.random = SystemRandom()
+        self.names = names
+        # read through `.current` on every command, so a reload applies to running rooms
+        self.presets = presets or PresetWatcher()
+        self.messages = messages or load_messages()
+        self.versions = versions or VersionResolver(aliases=self.presets.current.versions)
+        self.manifest = manifest
+        self.pool = pool
+        self.spoilers = spoilers
+        self.history = history
+        self.tasks = set()
+        self.throttle = Throttle()
+        self.state_lock = asyncio.Lock()
+        self.roll = None
+        self.store = store
+        self.outbox = Outbox(
+            super().send_message,
+            super().set_raceinfo,
+            min_interval=send_interval,
+            coalesce=coalesce_messages,
+            logger=self.logger,
+        )
+
+    async def handle(self):
+        ACTIVE_HANDLERS.inc()
+        try:
+            await super().handle()
+        finally:
+            for task in self.tasks:
+                task.cancel()
+            self.outbox.close()
+            ACTIVE_HANDLERS.dec()
+
+    async def end(self):
+        await self.outbox.flush()
+        if self.store is not None:
+            self.store.delete(self.data.get("name"))
+
+    async def send_message(self, message, **kwargs):
+        self.outbox.message(message, **kwargs)
+
+    async def set_raceinfo(self, info, overwrite=False, prefix=True):
+        self.outbox.raceinfo(info, overwrite, prefix)
+
+    async def chat_message(self, data):
+        # matched the way RaceHandler dispatches, so !INFO is !info here too
+        words = data.get("message", {}).get("message", "").lower().split(" ")
+        command = words[0][len(self.command_prefix):]
+        if not words[0].startswith(self.command_prefix.lower()) or not hasattr(self, "ex_" + command):
+            await super().chat_message(data)
+            return
+        message = data["message"]
+        if not (can_monitor(message) or message.get("is_bot") or message.get("is_system")):
+            user = message.get("user") or {}
+            verdict = self.throttle.check(self.presets.current.throttle, command, user.get("id"))
+            if verdict != ALLOW:
+                COMMANDS_THROTTLED.inc(command=command)
+                if verdict == REPLY:
+                    await self._say("throttled", name=user.get("name", "friend"), command=command)
+                return
+        with COMMAND_LATENCY.time(command=command):
+            if command in self.STATE_COMMANDS:
+                async with self.state_lock:
+                    await super().chat_message(data)
+            else:
+                await super().chat_message(data)
+        self._save_state()
 
     async def begin(self):
+        if not self.state and self.store is not None:
+            # the room may have been evicted from memory while idle
+            restored = await self.store.restore(self.data.get("name"))
+            if restored:
+                self.state.update(restored)
         if not self.state.get("intro_sent") and not self._race_in_progress():
-            await self.send_message(
-                "Welcome to Skyward Sword Randomizer! Setup your seed with !permalink <permalink> and !version <version> and roll with !rollseed"
-            )
-            await self.send_message(
-                "If no permalink is specified, standard race settings will be used. "
-                "If no version is specified, the version bundled with the bot will be used. Ask a member of server staff for details on which version this is"
-            )
-            await self.send_message(
-                "To enable draft mode, use !draft. Currently, draft mode must be self moderated, and is only designed for use in 1v1 races. If no picks or bans "
-                "are specified, a random option will be selected from the list of possible options"
-            )
+            await self._say("intro_roll")
+            await self._say("intro_defaults")
+            await self._say("intro_draft")
             self.state["intro_sent"] = True
-        self.state["permalink"] = self.STANDARD_RACE_PERMALINK
-        self.state["spoiler"] = False
-        self.state["version"] = None
-        self.state["draft"] = None
+        # state restored after a restart or reconnect is kept as it is
+        self.state.setdefault("permalink", self.presets.current.default_permalink)
+        self.state.setdefault("spoiler", False)
+        self.state.setdefault("version", None)
+        self.state.setdefault("draft", None)
+        self._save_state()
         #await self.edit(hide_comments=True)
 
     async def ex_francais(self, args, message):
         self.state["use_french"] = True
-        await self.send_message("Bot responses will now also be in French.")
-        await self.send_message(
-            "Les réponses du bot seront désormais également en français."
-        )
+        await self._say("french_on")
 
     async def ex_log(self, args, message):
-        if self.state.get("spoiler_url") and self.state.get("spoiler"):
-            url = self.state.get("spoiler_url")
-            await self.send_message(f"Spoiler Log can be found at {url}")
+        if not self.state.get("spoiler") or not self.state.get("permalink_available"):
+            return
+        url = self.state.get("spoiler_url")
+        if url is None and self.spoilers is not None:
+            key = self._spoiler_key()
+            url = self.spoilers.lookup(*key)
+            if url is None and self.spoilers.generating(*key):
+                await self._say("log_generating")
+                return
+        if url:
+            await self._say("log_url", url=url)
 
     async def ex_spoiler(self, args, message):
         spoiler = not self.state.get("spoiler")
         self.state["spoiler"] = spoiler
-        if spoiler:
-            await self.send_message("Will create a public sharable Spoiler Log")
-            if self.state.get("use_french"):
-                await self.send_message("Un Spoiler Log public et partageable sera créé")
-        else:
-            await self.send_message("Will NOT create a public sharable Spoiler Log")
-            if self.state.get("use_french"):
-                await self.send_message("Un Spoiler Log public et partageable ne sera PAS crée")
+        await self._say("spoiler_on" if spoiler else "spoiler_off")
 
     async def ex_info(self, args, message):
-        response = ""
-        if self.state.get("version") == None:
-            response += "No version specified. Using bundled version. "
-        else:
-            response += f"Version: {self.state.get('version')} "
-        response += f"Permalink: {self.state.get('permalink')} "
-        if self.state.get("spoiler"):
-            response += "Spoiler log will be generated and a link will be provided. "
-        else:
-            response += "Spoiler log will not be generated. "
-        if self.state.get("peramlink_available"):
-            response += "Seed has been rolled. Get it with !permalink. "
-        else:
-            response += "Seed not rolled. Roll with !rollseed. "
-        await self.send_message(response)
+        version = self.state.get("version")
+        await self._say(
+            (
+                "info_no_version" if version is None else "info_version",
+                "info_permalink",
+                "info_spoiler_on" if self.state.get("spoiler") else "info_spoiler_off",
+                "info_rolled" if self.state.get("permalink_available") else "info_not_rolled",
+            ),
+            version=version,
+            permalink=self.state.get("permalink"),
+        )
 
     async def ex_seed(self, args, message):
         if not self.state.get("permalink_available"):
-            await self.send_message("There is no seed! Please use !rollseed to get one")
-            if self.state.get("use_french"):
-                await self.send_message(
-                    "Translate 'There is no permalink! Please use !rollseed to get a permalink' to French"
-                )
+            await self._say("no_seed")
             return
-        permalink = self.state.get("permalink")
-        hash = self.state.get("hash")
-        seed = self.state.get("seed")
-        await self.send_message(f"Seed: {seed}, Hash: {hash}, Permalink: {permalink}")
-        if self.state.get("use_french"):
-            await self.send_message(
-                f"Translate 'The permalink is: {permalink}' to French."
-            )
+        await self._say(
+            "seed", seed=self.state.get("seed"), hash=self.state.get("hash"), permalink=self.state.get("permalink"),
+        )
 
     @monitor_cmd
     async def ex_lock(self, args, message):
         self.state["locked"] = True
-        await self.send_message("Seed rolling is now locked.")
-        if self.state.get("use_french"):
-            await self.send_message(
-                "La génération de seed est désormais bloquée."
-            )
+        self._audit("lock", message)
+        await self._say("locked")
 
     @monitor_cmd
     async def ex_unlock(self, args, message):
         self.state["locked"] = False
-        await self.send_message("Seed rolling is now unlocked")
-        if self.state.get("use_french"):
-            await self.send_message("La génération de seed est désormais débloquée.")
+        self._audit("unlock", message)
+        await self._say("unlocked")
 
     @monitor_cmd
     async def ex_reset(self, args, message):
-        self.state["permalink"] = self.STANDARD_RACE_PERMALINK
+        self.state["permalink"] = self.presets.current.default_permalink
         self.state["seed"] = None
         self.state["hash"] = None
         self.state["permalink_available"] = False
@@ -127,238 +185,270 @@ class RandoHandler(RaceHandler):
         self.state["spoiler_url"] = None
         self.state["version"] = None
         self.state["draft"] = None
-        await self.send_message("The Seed has been reset.")
-        if self.state.get("use_french"):
-            await self.send_message("La Seed a été réinitialisée")
+        self._audit("reset", message)
+        await self._say("reset")
 
     async def ex_permalink(self, args, message):
+        if len(args) == 0 or not is_valid(args[0]):
+            await self._say("invalid_permalink")
+            return
         permalink = args[0]
         self.state["permalink"] = permalink
-        await self.send_message(f"Updated permalink to {permalink}")
-        if self.state.get("use_french"):
-            await self.send_message(f"Permalien mis à jour: {permalink}")
+        await self._say("permalink_set", permalink=permalink)
+
+    async def ex_preset(self, args, message):
+        presets = self.presets.current
+        preset = self._apply_preset(args[0]) if args else None
+        if preset is None:
+            await self._say("presets_available", presets=", ".join(presets.presets))
+            return
+        await self._say("preset_set", label=preset.label)
 
     async def ex_sgl(self, args, message):
-        self.state["permalink"] = "IQ0IIDsD85rpUwAAAAAAACHIFwA="
-        await self.send_message(f"Updated the bot to SGL settings")
-        if self.state.get("use_french"):
-            await self.send_message("Mis à jour le bot pour les paramètres SGL")
+        if self._apply_preset("sgl") is None:
+            await self._say("preset_missing", label="SGL")
+            return
+        await self._say("preset_set", label="SGL")
 
     async def ex_coop(self, args, message):
-        self.state["permalink"] = "oQ0AIBAD85oJUgAAAAAAAAAQAw=="
-        self.state["version"] = "1.2.0_3868e57"
-        await self.send_message("Updated the bot to Co-Op S1 settings")
-        if self.state.get("use_french"):
-            await self.send_message("Mis à jour le bot pour les paramètres Co-Op S1")
+        if self._apply_preset("coop") is None:
+            await self._say("preset_missing", label="Co-Op")
+            return
+        await self._say("preset_set", label="Co-Op S1")
 
     async def ex_s2(self, args, message):
-        self.state["version"] = "1.2.0_f268afa"
-        self.state["draft"] = Draft()
-        self.state["draft"].set_log_state("off")
-        await self.send_message(
-            "Updated the bot to Season 2 version. Draft mode has been enabled and reset, and the spoiler log has been disabled. You may now use the command !draftguide (high seed) (low seed) to guide you through the draft process with two players.")
-        if self.state.get("use_french"):
-            await self.send_message(
-                "Mis à jour le bot à la version Saison 2. 'Draft Mode' a été activé et réinitialisé, et le spoiler log a été désactivé. Vous pouvez maintenant utiliser la commande !draftguide (seed haute) (seed basse) pour vous guider durant le processus de sélection avec deux joueurs.")
+        if self._apply_preset("s2") is None:
+            await self._say("preset_missing", label="Season 2")
+            return
+        await self._say("s2_set")
 
     async def ex_version(self, args, message):
+        if len(args) == 0:
+            version = self.state.get("version") or self.presets.current.default_version
+            await self._say("version_current", version=version)
+            return
         version = args[0]
-        if version[0] == 'v':
-            version = version[1:]
+        resolved = self.versions.lookup(version)
+        if resolved is None:
+            await self._say("version_lookup", version=version)
+            self._start_task(self._resolve_version(version))
+            return
+        await self._set_version(resolved)
+
+    async def _resolve_version(self, version):
+        try:
+            resolved = await self.versions.resolve(version)
+        except VersionUnknown:
+            await self._say("version_unknown", version=version)
+            return
+        except OSError:
+            self.logger.warning(f"Could not look up version {version}", exc_info=True)
+            await self._say("version_unavailable", version=version)
+            return
+        async with self.state_lock:
+            await self._set_version(resolved)
+        self._save_state()
+
+    async def _set_version(self, version):
         self.state["version"] = version
-        await self.send_message(f"Version set to {version}")
-        if self.state.get("use_french"):
-            await self.send_message(f"Version définie à {version}")
+        self._start_task(self.names.preload([commit_of(version)]))
+        await self._say("version_set", version=version)
 
     async def ex_draft(self, args, message):
         if self.state["draft"] is not None:
-            await self.send_message("Draft mode is already active")
-            if self.state.get("use_french"):
-                await self.send_message("'Draft Mode' est déjà actif")
+            await self._say("draft_active")
         else:
-            self.state["draft"] = Draft()
-            await self.send_message(
-                "Draft mode activated. The !ban and !pick commands are now active"
-            )
-            if self.state.get("use_french"):
-                await self.send_message(
-                    "'Draft Mode' activé. Les commandes !ban et !pick sont désormais utilisables"
-                )
+            self.state["draft"] = Draft(self.presets.current.draft)
+            await self._say("draft_on")
 
     async def ex_draftoff(self, args, message):
         self.state["draft"] = None
-        await self.send_message("Draft mode deactivated")
-        if self.state.get("use_french"):
-            await self.send_message("'Draft Mode' désactivé")
+        await self._say("draft_off")
 
     async def ex_ban(self, args, message):
         if self.state["draft"] is None:
-            await self.send_message("Draft mode is not active")
-            if self.state.get("use_french"):
-                await self.send_message("Draft Mode' n'est pas actif")
+            await self._say("draft_inactive")
         else:
             if len(args) == 0:
-                await self.send_message("No mode specified")
-                if self.state.get("use_french"):
-                    await self.send_message("Aucun mode spécifié")
+                await self._say("draft_no_option")
             else:
-                await self.send_message(self.state["draft"].ban(" ".join(args)))
+                draft = self.state["draft"]
+                banned = draft.banned_mask
+                response, fields = draft.ban(" ".join(args))
+                self._audit("ban", message, option=" ".join(args), accepted=draft.banned_mask != banned,
+                            banned=draft.banned)
+                await self._say(response, **fields)
 
     async def ex_pick(self, args, message):
         if self.state["draft"] is None:
-            await self.send_message("Draft mode is not active")
-            if self.state.get("use_french"):
-                await self.send_message("'Draft Mode' n'est pas actif")
+            await self._say("draft_inactive")
         else:
             if len(args) == 0:
-                await self.send_message("No mode specified")
-                if self.state.get("use_french"):
-                    await self.send_message("Aucun mode spécifié")
+                await self._say("draft_no_option")
             else:
-                await self.send_message(self.state["draft"].pick(" ".join(args)))
+                draft = self.state["draft"]
+                picked = draft.picked_mask
+                response, fields = draft.pick(" ".join(args))
+                self._audit("pick", message, option=" ".join(args), accepted=draft.picked_mask != picked,
+                            picked=draft.picked)
+                await self._say(response, **fields)
 
     async def ex_draftlog(self, args, message):
         if self.state["draft"] is None:
-            await self.send_message("Draft mode is not active")
-            if self.state.get("use_french"):
-                await self.send_message("'Draft Mode' n'est pas actif")
+            await self._say("draft_inactive")
         else:
             if len(args) == 0:
-                await self.send_message(
-                    "Please specify 'off' or 'on' to deactivate or activate the randomizer's spoiler log generation."
-                )
-                if self.state.get("use_french"):
-                    await self.send_message(
-                        "Veuillez spécifier 'off' ou 'on' pour désactiver ou activer la génération du Spoier Log"
-                    )
+                await self._say("draftlog_usage")
             else:
-                await self.send_message(
-                    self.state["draft"].set_log_state("".join(args).strip())
-                )
+                response, fields = self.state["draft"].set_log_state("".join(args).strip())
+                await self._say(response, **fields)
 
     async def ex_draftguide(self, args, message):
-        if self.state["draft"] is None:
-            await self.send_message("Draft mode is not active")
-            if self.state.get("use_french"):
-                await self.send_message("'Draft Mode' n'est pas actif")
+        draft = self.state["draft"]
+        if draft is None:
+            await self._say("draft_inactive")
+            return
+        formats = draft.options.formats
+        guide_format = formats[draft.options.default_format]
+        if args and args[0].lower() in formats:
+            guide_format = formats[args[0].lower()]
+            args = args[1:]
+        game = 1
+        if len(args) == 3 and args[2].isdigit():
+            game = int(args[2])
+            args = args[:2]
+        if len(args) != 2:
+            await self._say("draftguide_usage", formats=", ".join(formats))
+        elif not 1 <= game <= guide_format.games:
+            await self._say("draftguide_bad_game", format=guide_format.label, games=guide_format.games)
         else:
-            if len(args) != 2:
-                await self.send_message(
-                    "Please specify the higher seed and lower seed player names (in 1 word each) respectively for the guide process."
-                )
-                if self.state.get("use_french"):
-                    await self.send_message(
-                        "Veuillez spécifier les noms de la seed la plus haute et plus basse (en 1 mot chacun) pour le guidage."
-                    )
-            else:
-                self.state["draft"].banned = []
-                self.state["draft"].picked = []
-                await self.send_message(
-                    self.state["draft"].seeding_init(args[0], args[1])
-                )
+            draft.clear()
+            response, fields = draft.start_guide(guide_format, args[0], args[1], game)
+            await self._say(response, **fields)
 
     async def ex_draftguideoff(self, args, message):
         if self.state["draft"] is None:
-            await self.send_message("Draft mode is not active")
-            if self.state.get("use_french"):
-                await self.send_message("'Draft Mode' n'est pas actif")
-        self.state["draft"].guide_step = None
-        await self.send_message("Draft guide mode deactivated.")
-        if self.state.get("use_french"):
-            await self.send_message("Guide du 'Draft Mode' désactivé")
+            await self._say("draft_inactive")
+            return
+        self.state["draft"].stop_guide()
+        await self._say("draftguide_off")
 
     async def ex_draftstatus(self, args, message):
         draft = self.state["draft"]
         if draft is None:
-            await self.send_message("Draft mode is not active")
-            if self.state.get("use_french"):
-                await self.send_message("'Draft Mode' n'est pas actif")
+            await self._say("draft_inactive")
+        else:
+            parts = ("draft_status",)
+            player = None
+            status = draft.guide_status()
+            if status is not None:
+                next_step, player = status
+                parts += (next_step,)
+            await self._say(
+                parts + ("draft_status_odds",),
+                banned=draft.banned,
+                picked=draft.picked,
+                spoiler_log=draft.spoiler_log,
+                player=player,
+                odds=format_odds(draft.odds()),
+            )
+
+    async def ex_draftodds(self, args, message):
+        draft = self.state["draft"]
+        if draft is None:
+            await self._say("draft_inactive")
         else:
-            status_message = f"Draft mode is active. Currently banned: {draft.banned}. Currently picked: {draft.picked}. Spoiler log: {draft.spoiler_log}."
-            if self.state["draft"].guide_step is not None:
-                if self.state["draft"].guide_step in [0, 3]:
-                    status_message += f" Next step: {self.state['draft'].low_seed}"
-                else:
-                    status_message += f" Next step: {self.state['draft'].high_seed}"
-                if self.state["draft"].guide_step % 2 == 0:
-                    status_message += f" bans."
-                else:
-                    status_message += f" picks."
-            await self.send_message(status_message)
+            await self._say("draft_odds", odds=format_odds(draft.odds()))
 
     async def ex_draftoptions(self, args, message):
         if self.state["draft"] is None:
-            await self.send_message("Draft mode is not active")
-            if self.state.get("use_french"):
-                await self.send_message("'Draft Mode' n'est pas actif")
+            await self._say("draft_inactive")
         else:
-            await self.send_message(
-                f"Draft options: {', '.join(self.state['draft'].OPTIONS.keys())}"
-            )
+            await self._say("draft_options", options=", ".join(self.state["draft"].options.names))
 
     async def ex_rollseed(self, args, message):
-        print("rolling seed")
+        # checked for every caller, as only the roll itself is shared
         if self.state.get("locked") and not can_monitor(message):
-            await self.send_message(
-                "Seed rolling is locked! Only the creator of this room, a race monitor, "
-                "or a moderator can roll a seed."
-            )
-            if self.state.get("use_french"):
-                await self.send_message(
-                    "La génération de seed est bloquée! Seul le créateur de la salle, un moniteur, "
-                    "ou un modérateur peut générer une seed."
-                )
-
+            await self._say("roll_locked")
             return
+        # a !rollseed arriving while a roll is in progress shares that roll
+        if self.roll is None:
+            self.roll = asyncio.ensure_future(self._roll_seed(args, message))
+            self.roll.add_done_callback(self._roll_done)
+        await asyncio.shield(self.roll)
 
+    def _roll_done(self, roll):
+        self.roll = None
+
+    async def _roll_seed(self, args, message):
+        async with self.state_lock:
+            await self._roll_seed_locked(args, message)
+
+    async def _roll_seed_locked(self, args, message):
         if self.state.get("permalink_available"):
-            await self.send_message("The seed is already rolled! Use !seed to view it.")
-            if self.state.get("use_french"):
-                await self.send_message(
-                    "La seed a déjà été générée! Utilisez !seed pour la voir."
-                )
+            await self._say("already_rolled")
             return
 
-        await self.send_message("Rolling seed.....")
+        await self._say("rolling")
+        version = self.state.get("version") or self.presets.current.default_version
+        # the room only changes once the seed is rolled
+        mode = None
+        settings = self.state.get("permalink")
         if self.state["draft"] is not None:
-            (mode, perma) = self.state["draft"].make_selection()
-            await self.send_message(f"Selected mode {mode}")
-            self.state["permalink"] = perma
-        version = self.state.get("version") or "v2.0.0_b9f6c8d"
-        commit = version.split('_')[1]
-        seed_start = self.random.choice('123456789')
-        seed_end = "".join(self.random.choice(string.digits) for _ in range(17))
-        seed_name = seed_start + seed_end
-        permalink = f"{self.state.get('permalink')}#{seed_name}"
-        current_hash = hashlib.md5()
-        current_hash.update(str(seed_name).encode("ASCII"))
-        current_hash.update(permalink.encode("ASCII"))
-        current_hash.update(version.encode("ASCII"))
-        with urllib.request.urlopen(
-                f"http://raw.githubusercontent.com/ssrando/ssrando/{commit}/names.txt"
-        ) as f:
-            data = f.read().decode("utf-8")
-            names = [s.strip() for s in data.split("\n")]
-        hash_random = random.Random()
-        hash_random.seed(current_hash.digest())
-        hash = " ".join(hash_random.choice(names) for _ in range(3))
-        seed = seed_name
-
-        self.logger.info(permalink)
+            (mode, settings) = self.state["draft"].make_selection()
+
+        entry = None
+        pooled = None
+        if self.manifest is not None:
+            entry = self.manifest.claim(version, settings, self.data.get("name"))
+        if entry is None and self.pool is not None:
+            pooled = self.pool.pop(version, settings)
+            if pooled is not None and await self._seen(version, settings, pooled[0]):
+                pooled = None
+        if entry is not None:
+            seed = entry["seed"]
+            hash = entry["hash"]
+            source = "manifest"
+            await asyncio.get_event_loop().run_in_executor(None, self.manifest.save)
+        elif pooled is not None:
+            (seed, hash) = pooled
+            source = "pool"
+        else:
+            try:
+                names = await self.names.get(commit_of(version))
+            except (IndexError, NamesUnavailable) as e:
+                self.logger.warning(f"Unable to roll for version {version}: {e}")
+                await self._say("names_unavailable", version=version)
+                return
+            seed = generate_seed_name(self.random)
+            while await self._seen(version, settings, seed):
+                seed = generate_seed_name(self.random)
+            hash = compute_hash(seed, settings, version, names)
+            source = "live"
+        permalink = full_permalink(settings, seed)
+        ROLLS.inc(source=source)
+        if self.history is not None:
+            self.history.record(version, settings, seed, hash, self.data.get("name"))
+        self._audit(
+            "roll", message, version=version, permalink=permalink, seed=seed, hash=hash, source=source,
+            draft_option=mode,
+        )
 
+        if mode is not None:
+            await self._say("draft_selected", mode=mode)
         self.state["permalink"] = permalink
         self.state["hash"] = hash
         self.state["seed"] = seed
         self.state["permalink_available"] = True
 
-        await self.send_message(f"{version} Permalink: {permalink}, Hash: {hash}")
+        await self._say("rolled", version=version, permalink=permalink, hash=hash)
 
         if self.state.get("spoiler"):
-            url = generated_seed.get("spoiler_log_url")
-            self.state["spoiler_url"] = url
-            await self.send_message(f"Spoiler Log URL available at {url}")
-            if self.state.get("use_french"):
-                await self.send_message(f"Spoiler Log disponible à l'url: {url}")
+            if self.spoilers is None:
+                await self._say("spoiler_unavailable")
+            else:
+                await self._say("spoiler_generating")
+                self._start_task(self._publish_spoiler(self.spoilers.submit(*self._spoiler_key())))
 
         if self.state["draft"] is not None:
             await self.set_raceinfo(
@@ -373,5 +463,68 @@ class RandoHandler(RaceHandler):
                 False,
             )
 
+    async def _publish_spoiler(self, generation):
+        try:
+            url = await asyncio.shield(generation)
+        except (SpoilerLogError, OSError):
+            self.logger.error("Spoiler log generation failed.", exc_info=True)
+            await self._say("spoiler_failed")
+            return
+        self.state["spoiler_url"] = url
+        self._save_state()
+        await self._say("spoiler_ready", url=url)
+
+    async def _say(self, message, **fields):
+        """
+        Send catalog message `message` in the room's languages, as a single
+        chat message.
+        """
+        locales = BILINGUAL if self.state.get("use_french") else ENGLISH
+        await self.send_message(self.messages.render(message, locales, **fields))
+
+    async def _seen(self, version, settings, seed):
+        if self.history is None:
+            return False
+        if await self.history.seen(version, settings, seed):
+            self.logger.info(f"Seed {seed} was already rolled for {version} {settings}, rolling another")
+            return True
+        return False
+
+    def _apply_preset(self, name):
+        """
+        Apply the settings of preset `name` to the room, returning the
+        preset or None if there is no such preset.
+        """
+        presets = self.presets.current
+        preset = presets.preset(name)
+        if preset is None:
+            return None
+        if preset.permalink is not None:
+            self.state["permalink"] = preset.permalink
+        if preset.version is not None:
+            self.state["version"] = preset.version
+        if preset.draft:
+            self.state["draft"] = Draft(presets.draft)
+            self.state["draft"].set_log_state("on" if preset.spoiler_log else "off")
+        return preset
+
+    def _spoiler_key(self):
+        version = self.state.get("version") or self.presets.current.default_version
+        permalink = self.state.get("permalink").split("#")[0]
+        return (version, permalink, self.state.get("seed"))
+
+    def _start_task(self, coro):
+        task = asyncio.ensure_future(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    def _audit(self, event, message, **fields):
+        audit(event, room=self.data.get("name"), user=message.get("user", {}).get("name"), **fields)
+
+    def _save_state(self):
+        if self.store is not None:
+            self.store.save(self.data.get("name"), self.state)
+
     def _race_in_progress(self):
         return self.data.get("status").get("value") in ("pending", "in_progress")
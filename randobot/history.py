@@ -0,0 +1,316 @@
+import argparse
+import asyncio
+import hashlib
+import math
+import os
+import sqlite3
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+COLUMNS = ("version", "permalink", "seed", "hash", "room", "rolled_at")
+
+# errors from a row that would fail the same way on every retry
+UNWRITABLE = (sqlite3.InterfaceError, sqlite3.ProgrammingError, sqlite3.IntegrityError, ValueError, TypeError)
+
+
+def seed_key(version, permalink, seed):
+    return f"{version}\n{permalink}\n{seed}".encode("utf-8")
+
+
+def find_rolls(db, hash=None, seed=None):
+    """
+    Look up the rolls with a given hash and/or seed, newest first, as
+    dicts.
+    """
+    clauses, params = [], []
+    for column, value in (("hash", hash), ("seed", seed)):
+        if value is not None:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    if not clauses:
+        raise ValueError("Need a hash or a seed to look up")
+    rows = db.execute(
+        f"SELECT {', '.join(COLUMNS)} FROM seeds WHERE {' AND '.join(clauses)} ORDER BY rolled_at DESC",
+        params,
+    )
+    return [dict(zip(COLUMNS, row)) for row in rows]
+
+
+class BloomFilter:
+    """
+    Bloom filter over byte strings, sized for `capacity` entries at a
+    false positive rate of `error_rate`.
+    """
+
+    HEADER = struct.Struct("<4sQIQQ")
+    MAGIC = b"RBBF"
+    DIGEST = struct.Struct("<QQ")
+
+    def __init__(self, capacity=4_000_000, error_rate=1e-4):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.capacity = capacity
+        self.count = 0
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        # double hashing: the k positions are a + i * b, modulo the size
+        a, b = self.DIGEST.unpack(hashlib.blake2b(key, digest_size=16).digest())
+        size = self.size
+        position, step = a % size, b % size
+        positions = []
+        for _ in range(self.hashes):
+            positions.append(position)
+            position += step
+            if position >= size:
+                position -= size
+        return positions
+
+    def add(self, key):
+        bits = self.bits
+        for position in self._positions(key):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        bits = self.bits
+        for position in self._positions(key):
+            if not bits[position >> 3] >> (position & 7) & 1:
+                return False
+        return True
+
+    def snapshot(self, mark):
+        """
+        Serialize the filter with `mark`, the last database row it covers.
+        """
+        return self.HEADER.pack(self.MAGIC, self.size, self.hashes, self.count, mark) + bytes(self.bits)
+
+    @staticmethod
+    def save(path, snapshot):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(snapshot)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, capacity, error_rate):
+        """
+        Read a saved filter, returning (filter, mark), or None if there is
+        none or it was sized differently.
+        """
+        bloom = cls(capacity, error_rate)
+        try:
+            with open(path, "rb") as f:
+                header = f.read(cls.HEADER.size)
+                if len(header) != cls.HEADER.size:
+                    return None
+                magic, size, hashes, count, mark = cls.HEADER.unpack(header)
+                if magic != cls.MAGIC or size != bloom.size or hashes != bloom.hashes:
+                    return None
+                if f.readinto(bloom.bits) != len(bloom.bits):
+                    return None
+        except OSError:
+            return None
+        bloom.count = count
+        return bloom, mark
+
+
+class SeedHistory:
+    """
+    Persistent index of every rolled seed.
+
+    Rolls are kept in SQLite, indexed by hash and by seed, and written in
+    batches on a dedicated thread. A Bloom filter over (version, permalink,
+    seed) answers "was this seed rolled before?" without touching the disk
+    in almost every case; only a possible match is confirmed with a query.
+    The filter is saved next to the database with the last row it covers,
+    so startup reads it back and only adds newer rows, off the event loop;
+    until that is done duplicate checks go to the database. Lookups use
+    their own connection and thread, so they never wait behind indexing or
+    a batch of writes.
+    """
+
+    def __init__(self, path, capacity=4_000_000, error_rate=1e-4, flush_interval=1.0,
+                 save_interval=600, logger=None):
+        self.path = path
+        self.bloom_path = f"{path}.bloom"
+        self.flush_interval = flush_interval
+        self.save_interval = save_interval
+        self.logger = logger
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._read_executor = ThreadPoolExecutor(max_workers=1)
+        self._pending = []
+        self._pending_keys = set()
+        self._wakeup = None
+        self._indexed = False
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS seeds ("
+            "version TEXT NOT NULL, permalink TEXT NOT NULL, seed TEXT NOT NULL, "
+            "hash TEXT NOT NULL, room TEXT, rolled_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS seeds_seed ON seeds (seed)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS seeds_hash ON seeds (hash)")
+        self._db.commit()
+        self._reader = sqlite3.connect(path, check_same_thread=False)
+        self._reader.execute("PRAGMA busy_timeout=5000")
+
+        loaded = BloomFilter.load(self.bloom_path, capacity, error_rate)
+        if loaded is None:
+            self.bloom, self._mark = BloomFilter(capacity, error_rate), 0
+        else:
+            self.bloom, self._mark = loaded
+
+    async def seen(self, version, permalink, seed):
+        """
+        Whether this seed was rolled before with the same version and
+        permalink.
+        """
+        key = seed_key(version, permalink, seed)
+        if key in self._pending_keys:
+            return True
+        if self._indexed and key not in self.bloom:
+            return False
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self._read_executor, self._contains, version, permalink, seed)
+
+    def record(self, version, permalink, seed, hash, room):
+        # the filter picks the roll up once it is written
+        self._pending_keys.add(seed_key(version, permalink, seed))
+        self._pending.append((version, permalink, seed, hash, room, time.time()))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def find(self, hash=None, seed=None):
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self._read_executor, find_rolls, self._reader, hash, seed)
+
+    async def run(self):
+        self._wakeup = asyncio.Event()
+        if self._pending:
+            self._wakeup.set()
+        loop = asyncio.get_event_loop()
+        added = await loop.run_in_executor(self._executor, self._index_new_rows)
+        self._indexed = True
+        if added and self.logger:
+            self.logger.info(f"Indexed {added} seeds rolled since the history filter was saved")
+        if self.bloom.count > self.bloom.capacity and self.logger:
+            self.logger.warning(
+                f"Seed history holds {self.bloom.count} seeds, more than the filter is sized for; "
+                "duplicate checks will hit the database more often"
+            )
+        saved = loop.time()
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.save_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            pending, self._pending = self._pending, []
+            try:
+                try:
+                    await loop.run_in_executor(self._executor, self._write, pending)
+                except UNWRITABLE:
+                    # retrying would fail forever, so write the rows that can be written
+                    await loop.run_in_executor(self._executor, self._write_each, pending)
+            except sqlite3.Error:
+                self._pending = pending + self._pending
+                if self.logger:
+                    self.logger.error("Failed to write seed history.", exc_info=True)
+            else:
+                self._pending_keys.difference_update(seed_key(*row[:3]) for row in pending)
+            if loop.time() - saved >= self.save_interval:
+                # saved now and then, so a crash only costs indexing the newer rows
+                saved = loop.time()
+                try:
+                    await loop.run_in_executor(
+                        self._executor, BloomFilter.save, self.bloom_path, self.bloom.snapshot(self._mark),
+                    )
+                except OSError as e:
+                    if self.logger:
+                        self.logger.warning(f"Could not save the seed history filter: {e}")
+            await asyncio.sleep(self.flush_interval)
+
+    def close(self):
+        """
+        Write pending rolls, save the filter and close the database.
+        """
+        self._read_executor.shutdown(wait=True)
+        self._executor.shutdown(wait=True)
+        self._write(self._pending)
+        self._pending = []
+        try:
+            BloomFilter.save(self.bloom_path, self.bloom.snapshot(self._mark))
+        except OSError as e:
+            if self.logger:
+                self.logger.warning(f"Could not save the seed history filter: {e}")
+        self._reader.close()
+        self._db.close()
+
+    def _contains(self, version, permalink, seed):
+        row = self._reader.execute(
+            "SELECT 1 FROM seeds WHERE seed = ? AND version = ? AND permalink = ? LIMIT 1",
+            (seed, version, permalink),
+        ).fetchone()
+        return row is not None
+
+    def _write(self, rows):
+        if rows:
+            with self._db:
+                self._db.executemany(
+                    "INSERT INTO seeds (version, permalink, seed, hash, room, rolled_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+        self._index_new_rows()
+
+    def _write_each(self, rows):
+        for row in rows:
+            try:
+                self._write([row])
+            except UNWRITABLE:
+                if self.logger:
+                    self.logger.error(f"Dropping seed history row that cannot be written: {row!r}", exc_info=True)
+
+    def _index_new_rows(self):
+        """
+        Add the rows after the last indexed one to the filter, including
+        rows written by other processes sharing the database.
+        """
+        rows = self._db.execute(
+            "SELECT rowid, version, permalink, seed FROM seeds WHERE rowid > ? ORDER BY rowid", (self._mark,)
+        )
+        added = 0
+        for self._mark, version, permalink, seed in rows:
+            self.bloom.add(seed_key(version, permalink, seed))
+            added += 1
+        return added
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Look up rolled seeds in the SS RandoBot seed history",
+    )
+    parser.add_argument("history_db", type=str, help="seed history database (--history-db of the bot)")
+    parser.add_argument("--hash", type=str, help="hash to look up, e.g. \"Crystal Loftwing Facility\"")
+    parser.add_argument("--seed", type=str, help="seed name to look up")
+
+    args = parser.parse_args()
+    if args.hash is None and args.seed is None:
+        parser.error("give --hash and/or --seed")
+
+    db = sqlite3.connect(f"file:{args.history_db}?mode=ro", uri=True)
+    rows = find_rolls(db, hash=args.hash, seed=args.seed)
+    for row in rows:
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(row["rolled_at"]))
+        print(f"{when} {row['room'] or '-'} {row['version']} {row['seed']} {row['hash']} {row['permalink']}")
+    if not rows:
+        print("No matching rolls")
+
+
+if __name__ == "__main__":
+    main()
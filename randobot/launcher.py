@@ -0,0 +1,115 @@
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import time
+
+from . import add_bot_arguments, bot_kwargs, check_bot_arguments, configure_host
+from .bot import RandoBot
+from .preroll import SeedManifest
+from .logs import setup_logging
+
+
+def parse_category(value):
+    parts = value.split(":", 2)
+    if len(parts) != 3 or not all(parts):
+        raise argparse.ArgumentTypeError("expected <category_slug>:<client_id>:<client_secret>")
+    return tuple(parts)
+
+
+def run_worker(index, workers, categories, kwargs, verbose, audit_log, host, insecure):
+    """
+    Run one bot per category on a single event loop, handling only the
+    rooms the hash ring assigns to worker `index`. Each bot still has its
+    own seed pool, names lists and history filter.
+    """
+    # each worker archives its own audit file
+    logger = setup_logging(verbose, f"{audit_log}.{index}" if audit_log else None)
+    configure_host(host, insecure)
+    asyncio.set_event_loop(asyncio.new_event_loop())
+
+    # claims are only tracked in memory, so the bots of a worker share one manifest
+    if kwargs.get("manifest"):
+        kwargs = dict(kwargs, manifest=SeedManifest(kwargs["manifest"]))
+
+    bots = []
+    for position, (category_slug, client_id, client_secret) in enumerate(categories):
+        options = dict(kwargs)
+        # one metrics endpoint per worker, on consecutive ports
+        if options.get("metrics_port"):
+            options["metrics_port"] = options["metrics_port"] + index if position == 0 else None
+        bots.append(RandoBot(
+            category_slug=category_slug,
+            client_id=client_id,
+            client_secret=client_secret,
+            logger=logger,
+            shard=(index, workers) if workers > 1 else None,
+            **options,
+        ))
+
+    loop = asyncio.get_event_loop()
+    loop.add_signal_handler(signal.SIGTERM, loop.stop)
+    for bot in bots:
+        bot.start()
+    logger.info(f"Worker {index} serving {', '.join(slug for slug, _, _ in categories)}")
+    try:
+        loop.run_forever()
+    finally:
+        for bot in bots:
+            bot.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run SS RandoBot for several categories across worker processes",
+    )
+    parser.add_argument("--category", "-c", type=parse_category, action="append", required=True,
+                        metavar="SLUG:CLIENT_ID:CLIENT_SECRET", help="racetime.gg category, may be repeated")
+    parser.add_argument("--workers", "-w", type=int, default=os.cpu_count(),
+                        help="worker processes to split race rooms across")
+    add_bot_arguments(parser)
+
+    args = parser.parse_args()
+    check_bot_arguments(parser, args)
+    if args.manifest and args.workers > 1:
+        parser.error("--manifest needs --workers 1, claims are not shared between worker processes")
+
+    logger = setup_logging(args.verbose)
+    context = multiprocessing.get_context("spawn")
+    kwargs = bot_kwargs(args)
+
+    def spawn(index):
+        process = context.Process(
+            target=run_worker,
+            args=(index, args.workers, args.category, kwargs, args.verbose, args.audit_log, args.host, args.insecure),
+            name=f"randobot-worker-{index}",
+        )
+        process.start()
+        return process
+
+    processes = [spawn(index) for index in range(args.workers)]
+    stopping = False
+
+    def stop(*_):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    try:
+        while not stopping:
+            for index, process in enumerate(processes):
+                if not process.is_alive():
+                    logger.error(f"Worker {index} exited with {process.exitcode}, restarting")
+                    processes[index] = spawn(index)
+            time.sleep(1)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
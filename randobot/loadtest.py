@@ -0,0 +1,389 @@
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+import aiohttp
+from aiohttp import web
+
+from . import add_bot_arguments, bot_kwargs, check_bot_arguments, configure_host
+from .bot import RandoBot
+from .logs import setup_logging
+from .presets import DEFAULT_PRESETS_PATH, load_presets
+
+
+def load_trace(path):
+    """
+    Read a JSON lines trace written by `record`, returning the events of
+    each room in time order.
+    """
+    rooms = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                event = json.loads(line)
+                rooms.setdefault(event["room"], []).append(event)
+    for events in rooms.values():
+        events.sort(key=lambda event: event["at"])
+    return rooms
+
+
+def percentile(values, fraction):
+    """
+    Nearest-rank percentile of sorted `values`.
+    """
+    if not values:
+        return None
+    index = max(0, min(len(values) - 1, round(fraction * len(values)) - 1))
+    return values[index]
+
+
+class Room:
+    def __init__(self, slug, name, events):
+        self.slug = slug
+        self.name = name
+        self.events = events
+        self.ws = None
+        self.connected = asyncio.Event()
+        self.replies = asyncio.Queue()
+
+    def data(self):
+        return {
+            "name": f"{self.slug}/{self.name}",
+            "status": {"value": "open", "verbose_value": "Open", "help_text": ""},
+            "url": f"/{self.slug}/{self.name}",
+            "data_url": f"/{self.slug}/{self.name}/data",
+            "websocket_bot_url": f"/ws/o/bot/{self.name}",
+            "goal": {"name": "Beat the game", "custom": False},
+            "info": "",
+            "info_bot": None,
+            "info_user": "",
+            "entrants": [],
+        }
+
+
+class FakeRacetime:
+    """
+    Local stand-in for racetime.gg, serving the OAuth token, category and
+    race data endpoints and a bot websocket per room.
+
+    The server runs on its own thread and event loop, because `Bot`
+    authorizes with a blocking request before its loop starts. `replay`
+    then runs on that loop and plays a trace into the rooms' websockets,
+    timing how long the bot takes to answer each command.
+    """
+
+    def __init__(self, category_slug, trace, rooms, host="127.0.0.1", port=0):
+        self.category_slug = category_slug
+        self.trace = trace
+        self.room_count = rooms
+        self.host = host
+        self.port = port
+        self.rooms = {}
+        self.loop = None
+        self._runner = None
+        self._thread = None
+
+    def start(self):
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._serve, args=(ready,), name="fake-racetime", daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+
+    def _serve(self, ready):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self._start())
+        ready.set()
+        self.loop.run_forever()
+
+    async def _start(self):
+        # each simulated room replays one of the recorded rooms
+        recorded = list(self.trace.values())
+        for index in range(self.room_count):
+            name = f"load-{index:04d}"
+            self.rooms[name] = Room(self.category_slug, name, recorded[index % len(recorded)])
+
+        app = web.Application()
+        app.router.add_post("/o/token", self.token)
+        app.router.add_get("/ws/o/bot/{room}", self.websocket)
+        app.router.add_get("/{category}/data", self.category_data)
+        app.router.add_get("/{category}/{room}/data", self.race_data)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def token(self, request):
+        return web.json_response({"access_token": uuid.uuid4().hex, "expires_in": 36000})
+
+    async def category_data(self, request):
+        if request.match_info["category"] != self.category_slug:
+            raise web.HTTPNotFound()
+        return web.json_response({
+            "current_races": [
+                {"name": f"{self.category_slug}/{room.name}", "data_url": room.data()["data_url"]}
+                for room in self.rooms.values()
+            ],
+        })
+
+    async def race_data(self, request):
+        room = self.rooms.get(request.match_info["room"])
+        if room is None or request.match_info["category"] != self.category_slug:
+            raise web.HTTPNotFound()
+        return web.json_response(room.data())
+
+    async def websocket(self, request):
+        room = self.rooms.get(request.match_info["room"])
+        if room is None:
+            raise web.HTTPNotFound()
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        room.ws = ws
+        room.connected.set()
+        async for message in ws:
+            if message.type == aiohttp.WSMsgType.TEXT:
+                room.replies.put_nowait((time.perf_counter(), json.loads(message.data)))
+        return ws
+
+    async def replay(self, speed=1.0, reply_timeout=10.0, connect_timeout=60.0):
+        """
+        Play the trace into every room at `speed` times real time, and
+        return the latency of the first reply to each command.
+        """
+        await asyncio.wait_for(
+            asyncio.gather(*(room.connected.wait() for room in self.rooms.values())),
+            connect_timeout,
+        )
+        # let the intro messages go out before timing anything
+        await asyncio.sleep(1)
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *(self._replay_room(room, start, speed, reply_timeout) for room in self.rooms.values())
+        )
+        elapsed = time.perf_counter() - start
+        # close the rooms while the bot is still running to answer
+        await asyncio.gather(*(room.ws.close() for room in self.rooms.values()))
+
+        latencies = {}
+        timeouts = 0
+        for room_latencies, room_timeouts in results:
+            for command, latency in room_latencies:
+                latencies.setdefault(command, []).append(latency)
+            timeouts += room_timeouts
+        return summarize(latencies, timeouts, elapsed, len(self.rooms))
+
+    async def _replay_room(self, room, start, speed, reply_timeout):
+        latencies = []
+        timeouts = 0
+        for event in room.events:
+            delay = start + event["at"] / speed - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            is_command = event["message"].startswith("!")
+            if is_command:
+                while not room.replies.empty():
+                    room.replies.get_nowait()
+            sent = time.perf_counter()
+            await room.ws.send_json({
+                "type": "chat.message",
+                "message": {
+                    "id": uuid.uuid4().hex,
+                    "user": {"id": event["user"], "name": event["user"]},
+                    "message": event["message"],
+                    "is_monitor": event.get("monitor", False),
+                    "is_bot": False,
+                    "is_system": False,
+                    "posted_at": datetime.now(timezone.utc).isoformat(),
+                },
+            })
+            if not is_command:
+                continue
+            command = event["message"].split(" ")[0].lower()
+            try:
+                received, _ = await asyncio.wait_for(room.replies.get(), reply_timeout)
+            except asyncio.TimeoutError:
+                timeouts += 1
+                continue
+            latencies.append((command, received - sent))
+        return latencies, timeouts
+
+
+def summarize(latencies, timeouts, elapsed, rooms):
+    commands = {}
+    for command, values in sorted(latencies.items()):
+        values.sort()
+        commands[command] = {
+            "count": len(values),
+            "p50_ms": percentile(values, 0.5) * 1000,
+            "p90_ms": percentile(values, 0.9) * 1000,
+            "p99_ms": percentile(values, 0.99) * 1000,
+            "max_ms": values[-1] * 1000,
+        }
+    answered = sum(len(values) for values in latencies.values())
+    everything = sorted(value for values in latencies.values() for value in values)
+    return {
+        "rooms": rooms,
+        "elapsed_s": elapsed,
+        "commands": answered,
+        "timeouts": timeouts,
+        "throughput_per_s": answered / elapsed if elapsed else 0,
+        "p50_ms": (percentile(everything, 0.5) or 0) * 1000,
+        "p99_ms": (percentile(everything, 0.99) or 0) * 1000,
+        "by_command": commands,
+    }
+
+
+def print_report(report):
+    print(f"{report['commands']} commands in {report['rooms']} rooms over {report['elapsed_s']:.1f}s "
+          f"({report['throughput_per_s']:.1f}/s), {report['timeouts']} unanswered")
+    print(f"{'command':20} {'count':>7} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for command, stats in report["by_command"].items():
+        print(f"{command:20} {stats['count']:7} {stats['p50_ms']:9.2f} {stats['p90_ms']:9.2f} "
+              f"{stats['p99_ms']:9.2f} {stats['max_ms']:9.2f}")
+
+
+async def record(category_slug, output, host, secure, duration, scan_every=30):
+    """
+    Watch the public websockets of a category's open rooms and append
+    their chat messages to `output` as a trace.
+    """
+    base = f"{'https' if secure else 'http'}://{host}"
+    ws_base = f"{'wss' if secure else 'ws'}://{host}"
+    watching = {}
+    deadline = time.monotonic() + duration
+
+    async def watch(session, name, url, f):
+        first = None
+        async with session.ws_connect(ws_base + url) as ws:
+            async for message in ws:
+                if message.type != aiohttp.WSMsgType.TEXT:
+                    continue
+                data = json.loads(message.data)
+                chat = data.get("message") or {}
+                if data.get("type") != "chat.message" or chat.get("is_bot") or chat.get("is_system"):
+                    continue
+                now = time.monotonic()
+                first = first if first is not None else now
+                f.write(json.dumps({
+                    "room": name,
+                    "at": round(now - first, 3),
+                    "user": (chat.get("user") or {}).get("name"),
+                    "monitor": chat.get("is_monitor", False),
+                    "message": chat.get("message", ""),
+                }) + "\n")
+                f.flush()
+
+    with open(output, "a", encoding="utf-8") as f:
+        async with aiohttp.ClientSession(raise_for_status=True) as session:
+            while time.monotonic() < deadline:
+                async with session.get(f"{base}/{category_slug}/data") as response:
+                    races = (await response.json()).get("current_races", [])
+                for race in races:
+                    if race["name"] in watching:
+                        continue
+                    async with session.get(base + race["data_url"]) as response:
+                        race_data = await response.json()
+                    watching[race["name"]] = asyncio.ensure_future(
+                        watch(session, race["name"], race_data["websocket_url"], f)
+                    )
+                await asyncio.sleep(min(scan_every, max(0, deadline - time.monotonic())))
+            for task in watching.values():
+                task.cancel()
+            await asyncio.gather(*watching.values(), return_exceptions=True)
+    return len(watching)
+
+
+def replay(args):
+    if args.host or args.insecure:
+        raise SystemExit("replay always runs against its own local racetime server")
+    logger = setup_logging(args.verbose)
+    trace = load_trace(args.trace)
+    if not trace:
+        raise SystemExit(f"{args.trace} has no messages")
+
+    cache_dir = None
+    if args.names:
+        # seed a names cache so rolls never reach GitHub
+        cache_dir = args.cache_dir = tempfile.mkdtemp(prefix="randobot-loadtest-")
+        for commit in load_presets(args.presets or DEFAULT_PRESETS_PATH).commits():
+            shutil.copy(args.names, os.path.join(cache_dir, f"{commit}.txt"))
+
+    server = FakeRacetime(args.category, trace, args.rooms)
+    server.start()
+    try:
+        configure_host(f"{server.host}:{server.port}", True)
+        bot = RandoBot(
+            category_slug=args.category,
+            client_id="loadtest",
+            client_secret="loadtest",
+            logger=logger,
+            **bot_kwargs(args),
+        )
+        bot.start()
+        future = asyncio.run_coroutine_threadsafe(
+            server.replay(speed=args.speed, reply_timeout=args.reply_timeout), server.loop,
+        )
+        try:
+            report = bot.loop.run_until_complete(asyncio.wrap_future(future, loop=bot.loop))
+        finally:
+            bot.close()
+    finally:
+        server.stop()
+        if cache_dir:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Record racetime.gg room traces and replay them against SS RandoBot",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = commands.add_parser("record", help="record the chat of a category's open rooms")
+    record_parser.add_argument("category", type=str, help="racetime.gg category")
+    record_parser.add_argument("output", type=str, help="JSON lines trace to append to")
+    record_parser.add_argument("--duration", type=float, default=3600, help="seconds to record for")
+    record_parser.add_argument("--racetime-host", type=str, default="racetime.gg", help="racetime.gg host")
+    record_parser.add_argument("--insecure", action="store_true", help="don't use HTTPS")
+
+    replay_parser = commands.add_parser("replay", help="replay a trace against a local racetime server")
+    replay_parser.add_argument("trace", type=str, help="JSON lines trace written by record")
+    replay_parser.add_argument("--category", type=str, default="ssr", help="category slug to serve")
+    replay_parser.add_argument("--rooms", type=int, default=200, help="simulated rooms, each replaying one recorded room")
+    replay_parser.add_argument("--speed", type=float, default=10.0, help="replay speed relative to the recording")
+    replay_parser.add_argument("--reply-timeout", type=float, default=10.0, help="seconds to wait for a command's reply")
+    replay_parser.add_argument("--names", type=str, help="names.txt to use for every version instead of GitHub")
+    replay_parser.add_argument("--output", "-o", type=str, help="write the report as JSON to this file")
+    add_bot_arguments(replay_parser)
+
+    args = parser.parse_args()
+    if args.command == "record":
+        count = asyncio.get_event_loop().run_until_complete(
+            record(args.category, args.output, args.racetime_host, not args.insecure, args.duration)
+        )
+        print(f"Recorded {count} rooms to {args.output}")
+    else:
+        check_bot_arguments(replay_parser, args)
+        replay(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+
+
+AUDIT_LOGGER = "randobot.audit"
+
+audit_logger = logging.getLogger(AUDIT_LOGGER)
+
+
+def audit(event, **fields):
+    """
+    Record a structured audit event, e.g. `audit("roll", room=..., seed=...)`.
+    """
+    audit_logger.info(event, extra={"audit": {"event": event, **fields}})
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as one JSON object per line, with the fields of audit
+    events at the top level.
+    """
+
+    def format(self, record):
+        data = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+            + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+        }
+        fields = getattr(record, "audit", None)
+        if fields is not None:
+            data.update(fields)
+        else:
+            data["message"] = record.getMessage()
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class AuditFilter(logging.Filter):
+    def filter(self, record):
+        return hasattr(record, "audit")
+
+
+class ArchivingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    Size-rotated file that is never deleted: when full, it is renamed to
+    `<name>.<UTC time>` and a new file started, so the audit trail of
+    every roll is kept however long the bot runs.
+    """
+
+    def __init__(self, filename, max_bytes, encoding=None):
+        super().__init__(filename, mode="a", maxBytes=max_bytes, encoding=encoding)
+
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        archive = base = f"{self.baseFilename}.{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())}"
+        suffix = 1
+        while os.path.exists(archive):
+            # several rotations within a second
+            suffix += 1
+            archive = f"{base}.{suffix}"
+        if os.path.exists(self.baseFilename):
+            os.rename(self.baseFilename, archive)
+        self.stream = self._open()
+
+
+def setup_logging(verbose, audit_log=None, audit_max_bytes=10 * 1024 * 1024):
+    """
+    Route all logging through a queue, so the event loop never waits on
+    stdout or disk. A listener thread writes records to stdout and, when
+    `audit_log` is given, audit events to a JSON lines file archived
+    every `audit_max_bytes`, see `ArchivingFileHandler`.
+    """
+    logger = logging.getLogger()
+    handler = logging.StreamHandler(sys.stdout)
+
+    if verbose:
+        logger.setLevel(logging.DEBUG)
+        handler.setLevel(logging.DEBUG)
+    else:
+        handler.setLevel(logging.WARNING)
+    # audit events are recorded whatever the verbosity
+    audit_logger.setLevel(logging.INFO)
+
+    handler.setFormatter(logging.Formatter(
+        "[%(asctime)s] %(name)s (%(levelname)s) :: %(message)s"
+    ))
+    handlers = [handler]
+
+    if audit_log:
+        audit_handler = ArchivingFileHandler(audit_log, audit_max_bytes, encoding="utf-8")
+        audit_handler.addFilter(AuditFilter())
+        audit_handler.setFormatter(JsonFormatter())
+        handlers.append(audit_handler)
+
+    records = queue.Queue(-1)
+    listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    logger.addHandler(logging.handlers.QueueHandler(records))
+    return logger
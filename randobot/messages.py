@@ -0,0 +1,140 @@
+import json
+import os
+from string import Formatter
+from types import MappingProxyType
+
+
+DEFAULT_MESSAGES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "messages.json")
+
+ENGLISH = ("en",)
+BILINGUAL = ("en", "fr")
+
+
+class MessageError(ValueError):
+    """
+    Raised when a message catalog cannot be read or is invalid.
+    """
+
+
+def template_fields(template):
+    """
+    Return the names of the fields used by a str.format template, raising
+    ValueError for positional, indexed or attribute fields.
+    """
+    fields = set()
+    for _, field, _, _ in Formatter().parse(template):
+        if field is None:
+            continue
+        if not field.isidentifier():
+            raise ValueError(f"field {{{field}}} must be a plain name")
+        fields.add(field)
+    return frozenset(fields)
+
+
+class MessageCatalog:
+    """
+    Chat messages by ID and locale, validated and compiled from a catalog
+    file.
+
+    A response in several locales is one chat message, with a line per
+    locale. The combined template for a message and a choice of locales is
+    built once, and messages without fields are stored already rendered,
+    so sending a response is a dictionary lookup and at most one format
+    call.
+    """
+
+    __slots__ = ("locales", "separator", "templates", "fields", "_compiled")
+
+    def __init__(self, data):
+        if not isinstance(data, dict):
+            raise MessageError("Message catalog must contain a JSON object")
+        locales = data.get("locales")
+        if not isinstance(locales, list) or not locales or not all(isinstance(locale, str) for locale in locales):
+            raise MessageError("'locales' must list the catalog's locales, fallback first")
+        self.locales = tuple(locales)
+        self.separator = data.get("separator", "\n")
+        if not isinstance(self.separator, str):
+            raise MessageError("'separator' must be a string")
+
+        messages = data.get("messages")
+        if not isinstance(messages, dict):
+            raise MessageError("'messages' must map message IDs to templates by locale")
+        templates = {}
+        fields = {}
+        for message, translations in messages.items():
+            if not isinstance(translations, dict) or not isinstance(translations.get(self.locales[0]), str):
+                raise MessageError(f"Message {message!r} has no {self.locales[0]!r} template")
+            unknown = set(translations) - set(self.locales)
+            if unknown:
+                raise MessageError(f"Message {message!r} has templates for unknown locales {sorted(unknown)}")
+            try:
+                fields[message] = template_fields(translations[self.locales[0]])
+                for locale, template in translations.items():
+                    if not isinstance(template, str):
+                        raise ValueError(f"the {locale!r} template must be a string")
+                    extra = template_fields(template) - fields[message]
+                    if extra:
+                        raise ValueError(f"the {locale!r} template uses fields {sorted(extra)} "
+                                         f"missing from the {self.locales[0]!r} one")
+            except ValueError as e:
+                raise MessageError(f"Message {message!r}: {e}") from e
+            templates[message] = MappingProxyType(dict(translations))
+        self.templates = MappingProxyType(templates)
+        self.fields = MappingProxyType(fields)
+
+        self._compiled = {}
+        for locales in (ENGLISH, BILINGUAL):
+            if set(locales) <= set(self.locales):
+                for message in self.templates:
+                    self._compile(message, locales)
+
+    def _compile(self, message, locales):
+        """
+        Build the template for `message`, an ID or a tuple of IDs joined by
+        spaces, in each of `locales`. A locale missing a translation for
+        any of the parts is left out.
+        """
+        parts = (message,) if isinstance(message, str) else message
+        lines = []
+        for locale in locales:
+            if all(locale in self.templates[part] for part in parts):
+                line = " ".join(self.templates[part][locale] for part in parts)
+                if line not in lines:
+                    lines.append(line)
+        template = self.separator.join(lines)
+        if not any(self.fields[part] for part in parts):
+            # nothing to fill in, so render once; this unescapes {{ and }}
+            template = template.format()
+            compiled = (template, False)
+        else:
+            compiled = (template, True)
+        self._compiled[(message, locales)] = compiled
+        return compiled
+
+    def render(self, message, locales=ENGLISH, **fields):
+        """
+        Render `message`, an ID or a tuple of IDs joined by spaces, in
+        `locales`.
+        """
+        compiled = self._compiled.get((message, locales))
+        if compiled is None:
+            compiled = self._compile(message, locales)
+        template, has_fields = compiled
+        if has_fields:
+            return template.format_map(fields)
+        return template
+
+
+def load_messages(path=DEFAULT_MESSAGES_PATH):
+    """
+    Read and validate a message catalog.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise MessageError(f"Could not read messages from {path}: {e}") from e
+    try:
+        return MessageCatalog(data)
+    except MessageError as e:
+        raise MessageError(f"{path}: {e}") from e
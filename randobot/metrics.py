@@ -0,0 +1,209 @@
+import asyncio
+import threading
+import time
+
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n"))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class Metric:
+    """
+    Base class for metrics kept in process and rendered in the Prometheus
+    text format. Values are keyed by their sorted label pairs.
+    """
+
+    type = None
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.extend(self._render_value(labels, value))
+        return lines
+
+    def _render_value(self, labels, value):
+        return [f"{self.name}{_format_labels(labels)} {value}"]
+
+    def _add(self, amount, labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        self._add(amount, labels)
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def inc(self, amount=1, **labels):
+        self._add(amount, labels)
+
+    def dec(self, amount=1, **labels):
+        self._add(-amount, labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[tuple(sorted(labels.items()))] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[len(self.buckets)] += 1
+            counts[-1] += value
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+    def _render_value(self, labels, counts):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + ("+Inf",), counts):
+            cumulative += count
+            bucket_labels = labels + (("le", bound),)
+            lines.append(f"{self.name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(labels)} {counts[-1]}")
+        lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+COMMAND_LATENCY = REGISTRY.register(Histogram(
+    "randobot_command_duration_seconds", "Time spent handling a chat command.",
+))
+ROLLS = REGISTRY.register(Counter(
+    "randobot_rolls_total", "Seeds rolled, by where the seed came from.",
+))
+NAMES_FETCHES = REGISTRY.register(Counter(
+    "randobot_names_fetches_total", "names.txt downloads from GitHub, by result.",
+))
+NAMES_CACHE_HITS = REGISTRY.register(Counter(
+    "randobot_names_cache_hits_total", "names.txt lookups served from a cache, by cache.",
+))
+LOOP_LAG = REGISTRY.register(Histogram(
+    "randobot_event_loop_lag_seconds", "How late the event loop woke up a sleeping task.",
+))
+ACTIVE_HANDLERS = REGISTRY.register(Gauge(
+    "randobot_active_handlers", "Race room handlers currently running.",
+))
+COMMANDS_THROTTLED = REGISTRY.register(Counter(
+    "randobot_commands_throttled_total", "Commands rejected by the per-user and per-room rate limits.",
+))
+ROOMS = REGISTRY.register(Gauge(
+    "randobot_rooms", "Race rooms with state held in memory.",
+))
+ROOMS_EVICTED = REGISTRY.register(Counter(
+    "randobot_rooms_evicted_total", "Idle race rooms whose state was dropped from memory.",
+))
+ROOM_STATE_MEMORY = REGISTRY.register(Gauge(
+    "randobot_room_state_bytes", "Approximate memory held by the state of all rooms.",
+))
+HANDLER_MEMORY = REGISTRY.register(Gauge(
+    "randobot_handler_bytes", "Approximate memory held by running handlers, in total and the largest one.",
+))
+
+
+async def monitor_loop_lag(interval=1.0):
+    """
+    Measure how late the event loop runs a task after a fixed sleep.
+    """
+    loop = asyncio.get_event_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        LOOP_LAG.observe(max(0.0, loop.time() - start - interval))
+
+
+async def _serve_request(reader, writer):
+    try:
+        request = await reader.readline()
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass
+        parts = request.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+            status, body = "200 OK", REGISTRY.render()
+        else:
+            status, body = "404 Not Found", "Not found\n"
+        body = body.encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status}\r\n"
+            "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+    finally:
+        writer.close()
+
+
+async def serve(host, port):
+    """
+    Serve the registry on http://host:port/metrics.
+    """
+    return await asyncio.start_server(_serve_request, host, port)
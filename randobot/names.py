@@ -0,0 +1,139 @@
+import asyncio
+import os
+import re
+import urllib.request
+from collections import OrderedDict
+
+from .metrics import NAMES_CACHE_HITS, NAMES_FETCHES
+
+
+NAMES_URL = "https://raw.githubusercontent.com/ssrando/ssrando/{commit}/names.txt"
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "ss-rando-bot",
+)
+
+_COMMIT_RE = re.compile(r"^[\w.-]+$")
+
+
+class NamesUnavailable(Exception):
+    """
+    Raised when a names list is neither cached nor reachable on GitHub.
+    """
+
+
+def commit_of(version):
+    """
+    Return the commit part of a `<version>_<commit>` string.
+    """
+    return version.split("_")[1]
+
+
+def parse_names(data):
+    return tuple(s.strip() for s in data.split("\n"))
+
+
+class NamesProvider:
+    """
+    Provides the names.txt word lists used for seed hashes, keyed by commit.
+
+    Lists are kept in an in-memory LRU backed by an on-disk cache. The list
+    for a given commit never changes, so a cached copy is always used before
+    GitHub is asked, and fetches run in a worker thread so the event loop
+    is never blocked.
+    """
+
+    def __init__(self, cache_dir=None, max_entries=8, timeout=10, logger=None):
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.logger = logger
+        self._memory = OrderedDict()
+        # commit -> future of a load in progress, shared by every caller
+        self._loading = {}
+
+    def cached(self, commit):
+        """
+        Return the in-memory names list for `commit`, or None.
+        """
+        names = self._memory.get(commit)
+        if names is not None:
+            self._memory.move_to_end(commit)
+            NAMES_CACHE_HITS.inc(cache="memory")
+        return names
+
+    async def get(self, commit):
+        """
+        Return the names list for `commit`, loading it off the event loop if
+        it is not in memory yet. Concurrent calls for the same commit share
+        one load.
+        """
+        names = self.cached(commit)
+        if names is not None:
+            return names
+        loading = self._loading.get(commit)
+        if loading is None:
+            loop = asyncio.get_event_loop()
+            loading = self._loading[commit] = loop.run_in_executor(None, self.load, commit)
+            loading.add_done_callback(lambda future: self._loaded(commit, future))
+        return await asyncio.shield(loading)
+
+    def _loaded(self, commit, future):
+        if self._loading.get(commit) is future:
+            del self._loading[commit]
+        if not future.cancelled() and future.exception() is None:
+            self._remember(commit, future.result())
+
+    async def preload(self, commits):
+        """
+        Warm the cache for every commit in `commits`, logging failures.
+        """
+        results = await asyncio.gather(
+            *(self.get(commit) for commit in commits),
+            return_exceptions=True,
+        )
+        for commit, result in zip(commits, results):
+            if isinstance(result, Exception) and self.logger:
+                self.logger.warning(f"Could not preload names for {commit}: {result}")
+
+    def load(self, commit):
+        """
+        Blocking load of the names list for `commit`: disk first, then GitHub.
+        """
+        if not _COMMIT_RE.match(commit):
+            raise NamesUnavailable(f"Invalid commit {commit!r}")
+        path = os.path.join(self.cache_dir, f"{commit}.txt")
+        try:
+            with open(path, encoding="utf-8") as f:
+                names = parse_names(f.read())
+            NAMES_CACHE_HITS.inc(cache="disk")
+            return names
+        except OSError:
+            pass
+
+        try:
+            with urllib.request.urlopen(
+                NAMES_URL.format(commit=commit), timeout=self.timeout
+            ) as f:
+                data = f.read().decode("utf-8")
+        except (OSError, ValueError) as e:
+            NAMES_FETCHES.inc(result="error")
+            raise NamesUnavailable(f"Could not fetch names for {commit}: {e}") from e
+        NAMES_FETCHES.inc(result="ok")
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            if self.logger:
+                self.logger.warning(f"Could not cache names for {commit}: {e}")
+        return parse_names(data)
+
+    def _remember(self, commit, names):
+        self._memory[commit] = names
+        self._memory.move_to_end(commit)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
@@ -0,0 +1,132 @@
+import asyncio
+from collections import deque
+
+
+# what racetime_bot puts between new and existing race info
+INFO_SEPARATOR = " | "
+
+
+def merge_raceinfo(first, second):
+    """
+    Combine two race info updates, as (info, kwargs), into one with the
+    same result, or return None if they cannot be. An update that is not
+    an overwrite adds to the info shown before it.
+    """
+    info, kwargs = first
+    next_info, next_kwargs = second
+    if next_kwargs["overwrite"]:
+        return second
+    if not kwargs["overwrite"] and kwargs["prefix"] != next_kwargs["prefix"]:
+        return None
+    if not info:
+        return (next_info, kwargs)
+    if next_kwargs["prefix"]:
+        return (next_info + INFO_SEPARATOR + info, kwargs)
+    return (info + INFO_SEPARATOR + next_info, kwargs)
+
+
+class Outbox:
+    """
+    Outbound queue for one race room.
+
+    Chat messages and race info updates are queued and written by a
+    background task, so commands never wait on the websocket. While the
+    task waits for the send interval, back-to-back plain messages are joined
+    into one chat message (up to `max_length` characters) and consecutive
+    race info updates are merged into one, see `merge_raceinfo`.
+
+    Joined messages are separated by `separator`, a line break by default,
+    which relies on racetime.gg showing line breaks in chat. With
+    `coalesce` off every message is sent on its own.
+    """
+
+    def __init__(self, send_message, set_raceinfo, min_interval=0.2,
+                 max_length=1000, separator="\n", coalesce=True, logger=None):
+        self._send_message = send_message
+        self._set_raceinfo = set_raceinfo
+        self.min_interval = min_interval
+        self.coalesce = coalesce
+        self.max_length = max_length
+        self.separator = separator
+        self.logger = logger
+
+        self._queue = deque()
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._task = None
+        self._last_send = None
+
+    def message(self, message, **kwargs):
+        self._put(("message", message, kwargs))
+
+    def raceinfo(self, info, overwrite=False, prefix=True):
+        self._put(("raceinfo", info, {"overwrite": overwrite, "prefix": prefix}))
+
+    async def flush(self):
+        """
+        Wait until everything queued so far has been sent.
+        """
+        await self._idle.wait()
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._queue.clear()
+        self._idle.set()
+
+    def _put(self, item):
+        self._queue.append(item)
+        self._idle.clear()
+        self._wakeup.set()
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    def _next_frame(self):
+        kind, payload, kwargs = self._queue.popleft()
+        if kind == "raceinfo":
+            while self._queue and self._queue[0][0] == "raceinfo":
+                merged = merge_raceinfo((payload, kwargs), self._queue[0][1:])
+                if merged is None:
+                    break
+                payload, kwargs = merged
+                self._queue.popleft()
+        elif self.coalesce and not kwargs:
+            parts = [payload]
+            length = len(payload)
+            while self._queue:
+                next_kind, next_payload, next_kwargs = self._queue[0]
+                if next_kind != "message" or next_kwargs:
+                    break
+                length += len(self.separator) + len(next_payload)
+                if length > self.max_length:
+                    break
+                parts.append(next_payload)
+                self._queue.popleft()
+            payload = self.separator.join(parts)
+        return kind, payload, kwargs
+
+    async def _run(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            if not self._queue:
+                self._idle.set()
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            if self._last_send is not None:
+                delay = self._last_send + self.min_interval - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            # yield once so messages queued by the same command can coalesce
+            await asyncio.sleep(0)
+            kind, payload, kwargs = self._next_frame()
+            try:
+                if kind == "raceinfo":
+                    await self._set_raceinfo(payload, **kwargs)
+                else:
+                    await self._send_message(payload, **kwargs)
+            except Exception:
+                if self.logger:
+                    self.logger.error("Failed to send queued message.", exc_info=True)
+            self._last_send = loop.time()
@@ -0,0 +1,90 @@
+import base64
+import binascii
+
+
+# Known settings as (bit offset, bit width) within the settings bitfield.
+# The randomizer packs settings least significant bit first, so bit `n` of
+# the field is bit `n % 8` of byte `n // 8` of the decoded permalink.
+SETTINGS = {
+    "no-spoiler-log": (54, 1),
+}
+
+# every permalink holds at least the known settings; shorter base64 is not one
+MIN_LENGTH = max((offset + width + 7) // 8 for offset, width in SETTINGS.values())
+
+
+class InvalidPermalink(ValueError):
+    """
+    Raised when a string is not a valid settings permalink.
+    """
+
+
+class Permalink:
+    """
+    Decoded settings permalink.
+
+    The settings are held as a single integer bitfield, so reading or
+    changing a setting is a shift and a mask. Instances are immutable:
+    `set` returns a new permalink.
+    """
+
+    __slots__ = ("bits", "length")
+
+    def __init__(self, bits, length):
+        self.bits = bits
+        self.length = length
+
+    @classmethod
+    def decode(cls, permalink):
+        try:
+            raw = base64.b64decode(permalink, validate=True)
+        except (binascii.Error, ValueError):
+            raise InvalidPermalink(f"{permalink!r} is not valid base64")
+        if len(raw) < MIN_LENGTH:
+            raise InvalidPermalink(f"Permalink is too short, it needs at least {MIN_LENGTH} bytes")
+        return cls(int.from_bytes(raw, "little"), len(raw))
+
+    def encode(self):
+        return base64.b64encode(self.bits.to_bytes(self.length, "little")).decode("ascii")
+
+    def get(self, name):
+        offset, width = self._field(name)
+        return (self.bits >> offset) & ((1 << width) - 1)
+
+    def set(self, name, value):
+        offset, width = self._field(name)
+        mask = ((1 << width) - 1) << offset
+        return Permalink((self.bits & ~mask) | ((value << offset) & mask), self.length)
+
+    def _field(self, name):
+        offset, width = SETTINGS[name]
+        if offset + width > self.length * 8:
+            raise InvalidPermalink(f"Permalink is too short to hold {name}")
+        return offset, width
+
+    def __eq__(self, other):
+        return isinstance(other, Permalink) and (self.bits, self.length) == (other.bits, other.length)
+
+    def __hash__(self):
+        return hash((self.bits, self.length))
+
+    def __str__(self):
+        return self.encode()
+
+    def __repr__(self):
+        return f"Permalink({self.encode()!r})"
+
+
+def is_valid(permalink):
+    try:
+        Permalink.decode(permalink)
+    except InvalidPermalink:
+        return False
+    return True
+
+
+def with_setting(permalink, name, value):
+    """
+    Return `permalink` with the setting `name` changed to `value`.
+    """
+    return Permalink.decode(permalink).set(name, value).encode()
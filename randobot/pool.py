@@ -0,0 +1,66 @@
+import asyncio
+from collections import deque
+from random import SystemRandom
+
+from .names import NamesUnavailable, commit_of
+from .seed import compute_hash, generate_seed_name
+
+
+class SeedPool:
+    """
+    Pre-rolled seeds kept in memory for popular (version, permalink) pairs.
+
+    Rolling pops a ready (seed name, hash) pair. A background task refills
+    every pair that falls to `low_water` seeds back up to `size`, yielding
+    to the event loop after each seed so it never delays chat handling.
+    """
+
+    def __init__(self, names, configs, size=3, low_water=1, logger=None):
+        self.names = names
+        self.size = size
+        self.low_water = low_water
+        self.logger = logger
+        self.random = SystemRandom()
+        self.pools = {config: deque() for config in configs}
+        self._wakeup = None
+
+    def set_configs(self, configs):
+        """
+        Replace the pairs kept in the pool, keeping the seeds of pairs that
+        are still wanted.
+        """
+        self.pools = {config: self.pools.get(config, deque()) for config in configs}
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def pop(self, version, permalink):
+        """
+        Return a ready (seed name, hash) pair, or None if there is none.
+        """
+        pool = self.pools.get((version, permalink))
+        if not pool:
+            return None
+        entry = pool.popleft()
+        if len(pool) <= self.low_water and self._wakeup is not None:
+            self._wakeup.set()
+        return entry
+
+    async def run(self):
+        self._wakeup = asyncio.Event()
+        while True:
+            # cleared before the pass, so a pop during it triggers another one
+            self._wakeup.clear()
+            for (version, permalink), pool in self.pools.items():
+                if len(pool) > self.low_water:
+                    continue
+                try:
+                    names = await self.names.get(commit_of(version))
+                except NamesUnavailable as e:
+                    if self.logger:
+                        self.logger.warning(f"Not refilling seed pool for {version}: {e}")
+                    continue
+                while len(pool) < self.size:
+                    seed_name = generate_seed_name(self.random)
+                    pool.append((seed_name, compute_hash(seed_name, permalink, version, names)))
+                    await asyncio.sleep(0)
+            await self._wakeup.wait()
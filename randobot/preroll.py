@@ -0,0 +1,127 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+from collections import defaultdict, deque
+from random import SystemRandom
+
+from .names import NamesProvider, NamesUnavailable, commit_of
+from .permalink import is_valid
+from .seed import compute_hash, generate_seed_name
+
+
+class SeedManifest:
+    """
+    A JSON file of pre-rolled seeds that race rooms can claim.
+
+    Each entry holds the version, settings permalink, seed name and hash of
+    one seed, plus the name of the room that claimed it, if any.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.seeds = []
+        self._unclaimed = defaultdict(deque)
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.seeds = json.load(f).get("seeds", [])
+        for entry in self.seeds:
+            if not entry.get("claimed_by"):
+                self._unclaimed[(entry["version"], entry["permalink"])].append(entry)
+
+    def add(self, entries):
+        for entry in entries:
+            self.seeds.append(entry)
+            self._unclaimed[(entry["version"], entry["permalink"])].append(entry)
+
+    def available(self, version, permalink):
+        return len(self._unclaimed.get((version, permalink), ()))
+
+    def claim(self, version, permalink, room):
+        """
+        Mark the next unclaimed seed for this version and permalink as used
+        by `room` and return it, or return None if there is none left.
+        """
+        unclaimed = self._unclaimed.get((version, permalink))
+        if not unclaimed:
+            return None
+        entry = unclaimed.popleft()
+        entry["claimed_by"] = room
+        return entry
+
+    def save(self):
+        with self._lock:
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"seeds": self.seeds}, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+
+def roll_seeds(version, permalink, names, count, rng=None):
+    """
+    Roll `count` seeds for one version and permalink using a loaded names list.
+    """
+    rng = rng or SystemRandom()
+    entries = []
+    for _ in range(count):
+        seed_name = generate_seed_name(rng)
+        entries.append({
+            "version": version,
+            "permalink": permalink,
+            "seed": seed_name,
+            "hash": compute_hash(seed_name, permalink, version, names),
+            "claimed_by": None,
+        })
+    return entries
+
+
+async def preroll(manifest, names, configs, count):
+    """
+    Roll `count` seeds for every (version, permalink) pair in `configs`.
+
+    The names lists for all versions are fetched concurrently, once each.
+    """
+    commits = list({commit_of(version) for version, _ in configs})
+    lists = dict(zip(commits, await asyncio.gather(*(names.get(c) for c in commits))))
+    for version, permalink in configs:
+        manifest.add(roll_seeds(version, permalink, lists[commit_of(version)], count))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Pre-roll SS Randomizer seeds into a manifest that race rooms claim from",
+    )
+    parser.add_argument("manifest", type=str, help="manifest file to create or extend")
+    parser.add_argument("--version", type=str, action="append", required=True,
+                        help="randomizer version (<version>_<commit>), may be repeated")
+    parser.add_argument("--permalink", type=str, action="append", required=True,
+                        help="settings permalink, may be repeated")
+    parser.add_argument("--count", "-n", type=int, default=10, help="seeds per version and permalink")
+    parser.add_argument("--cache-dir", type=str, help="directory for cached names lists")
+
+    args = parser.parse_args()
+
+    for permalink in args.permalink:
+        if not is_valid(permalink):
+            parser.error(f"invalid permalink {permalink}")
+    for version in args.version:
+        if "_" not in version:
+            parser.error(f"invalid version {version}, expected <version>_<commit>")
+
+    manifest = SeedManifest(args.manifest)
+    configs = [(v, p) for v in args.version for p in args.permalink]
+    try:
+        asyncio.run(preroll(manifest, NamesProvider(cache_dir=args.cache_dir), configs, args.count))
+    except NamesUnavailable as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    manifest.save()
+    for version, permalink in configs:
+        print(f"{version} {permalink}: {manifest.available(version, permalink)} seeds available")
+
+
+if __name__ == "__main__":
+    main()
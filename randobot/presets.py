@@ -0,0 +1,221 @@
+import asyncio
+import json
+import os
+from collections import namedtuple
+from types import MappingProxyType
+
+from .draft import DEFAULT_FORMATS, DraftOptions, normalize, parse_formats
+from .names import commit_of
+from .permalink import is_valid
+from .throttle import parse_limits
+from .versions import FULL_VERSION_RE
+
+
+DEFAULT_PRESETS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "presets.json")
+
+Preset = namedtuple("Preset", ("name", "label", "permalink", "version", "draft", "spoiler_log"))
+
+
+class PresetError(ValueError):
+    """
+    Raised when a preset file cannot be read or is invalid.
+    """
+
+
+class Presets:
+    """
+    Immutable registry of versions, presets and draft options, parsed and
+    validated from a preset file.
+
+    Everything derived from the file is built here once, so a new registry
+    can replace the old one in a single assignment while rooms keep using
+    the one they started with.
+    """
+
+    __slots__ = ("versions", "default_version", "presets", "default_permalink", "draft", "draft_versions", "throttle")
+
+    def __init__(self, data):
+        if not isinstance(data, dict):
+            raise PresetError("Preset file must contain a JSON object")
+
+        versions = data.get("versions", {})
+        if not isinstance(versions, dict):
+            raise PresetError("'versions' must map names to <version>_<commit>")
+        for name, version in versions.items():
+            if not isinstance(version, str) or not FULL_VERSION_RE.match(version):
+                raise PresetError(f"Version {name!r} must be <version>_<commit>, got {version!r}")
+        self.versions = MappingProxyType({name.lower(): version for name, version in versions.items()})
+        self.default_version = self._version(data.get("default_version"), "default_version")
+
+        presets = {}
+        for name, entry in data.get("presets", {}).items():
+            presets[name.lower()] = self._preset(name.lower(), entry)
+        self.presets = MappingProxyType(presets)
+
+        default_preset = presets.get(str(data.get("default_preset", "")).lower())
+        if default_preset is None or default_preset.permalink is None:
+            raise PresetError("'default_preset' must name a preset with a permalink")
+        self.default_permalink = default_preset.permalink
+
+        draft = data.get("draft", {})
+        options = {}
+        aliases = {}
+        for option in draft.get("options", ()):
+            name = option.get("name")
+            permalink = option.get("permalink")
+            if not isinstance(name, str) or not name.strip():
+                raise PresetError(f"Draft option without a name: {option!r}")
+            if name in options:
+                raise PresetError(f"Duplicate draft option {name!r}")
+            if not is_valid(permalink):
+                raise PresetError(f"Draft option {name!r} has an invalid permalink")
+            options[name] = permalink
+            aliases[name] = tuple(option.get("aliases", ()))
+        if not options:
+            raise PresetError("At least one draft option is required")
+        keys = {}
+        for name in options:
+            for key in (name,) + aliases[name]:
+                other = keys.setdefault(normalize(key), name)
+                if other != name:
+                    raise PresetError(f"{key!r} names both draft options {other!r} and {name!r}")
+        try:
+            formats = parse_formats(draft.get("formats", DEFAULT_FORMATS))
+        except ValueError as e:
+            raise PresetError(str(e)) from e
+        default_format = str(draft.get("default_format", next(iter(formats)))).lower()
+        if default_format not in formats:
+            raise PresetError(f"'default_format' refers to unknown draft format {default_format!r}")
+        self.draft = DraftOptions(options, aliases, formats, default_format)
+        self.draft_versions = tuple(
+            self._version(version, "draft versions") for version in draft.get("versions", ())
+        )
+
+        try:
+            self.throttle = MappingProxyType(parse_limits(data.get("throttle", {})))
+        except ValueError as e:
+            raise PresetError(str(e)) from e
+
+    def _version(self, name, field):
+        if not isinstance(name, str):
+            raise PresetError(f"{field} must be a version name")
+        if FULL_VERSION_RE.match(name):
+            return name
+        if name.lower() not in self.versions:
+            raise PresetError(f"{field} refers to unknown version {name!r}")
+        return self.versions[name.lower()]
+
+    def _preset(self, name, entry):
+        if not isinstance(entry, dict):
+            raise PresetError(f"Preset {name!r} must be an object")
+        permalink = entry.get("permalink")
+        if permalink is not None and not is_valid(permalink):
+            raise PresetError(f"Preset {name!r} has an invalid permalink")
+        version = entry.get("version")
+        if version is not None:
+            version = self._version(version, f"Preset {name!r}")
+        if permalink is None and version is None:
+            raise PresetError(f"Preset {name!r} sets neither a permalink nor a version")
+        return Preset(
+            name=name,
+            label=entry.get("label", name),
+            permalink=permalink,
+            version=version,
+            draft=bool(entry.get("draft", False)),
+            spoiler_log=entry.get("spoiler_log", True),
+        )
+
+    def preset(self, name):
+        return self.presets.get(name.lower())
+
+    def known_versions(self):
+        """
+        Every version the registry refers to, default first.
+        """
+        versions = [self.default_version, *self.versions.values()]
+        versions += [preset.version for preset in self.presets.values() if preset.version]
+        return tuple(dict.fromkeys(versions))
+
+    def commits(self):
+        return [commit_of(version) for version in self.known_versions()]
+
+    def pool_configs(self):
+        """
+        (version, permalink) pairs worth keeping pre-rolled seeds for.
+        """
+        configs = [(self.default_version, self.default_permalink)]
+        for preset in self.presets.values():
+            if preset.permalink is not None:
+                configs.append((preset.version or self.default_version, preset.permalink))
+        for version in self.draft_versions:
+            for name in self.draft.names:
+                configs.append((version, self.draft.options[name]))
+                configs.append((version, self.draft.no_spoiler_options[name]))
+        return list(dict.fromkeys(configs))
+
+
+def load_presets(path=DEFAULT_PRESETS_PATH):
+    """
+    Read and validate a preset file.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise PresetError(f"Could not read presets from {path}: {e}") from e
+    try:
+        return Presets(data)
+    except PresetError as e:
+        raise PresetError(f"{path}: {e}") from e
+    except (AttributeError, TypeError) as e:
+        raise PresetError(f"{path}: malformed presets: {e}") from e
+
+
+class PresetWatcher:
+    """
+    Holds the current preset registry and swaps in a new one when the
+    preset file changes.
+
+    The file's modification time is polled every `interval` seconds. A new
+    file is loaded off the event loop and only replaces `current` if it is
+    valid; listeners are then called with the new registry to rebuild
+    anything derived from it.
+    """
+
+    def __init__(self, path=DEFAULT_PRESETS_PATH, interval=5.0, logger=None):
+        self.path = path
+        self.interval = interval
+        self.logger = logger
+        self._stamp = self._stat()
+        self.current = load_presets(path)
+        self._listeners = []
+
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    async def run(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            await asyncio.sleep(self.interval)
+            stamp = self._stat()
+            if stamp is None or stamp == self._stamp:
+                continue
+            self._stamp = stamp
+            try:
+                presets = await loop.run_in_executor(None, load_presets, self.path)
+            except PresetError as e:
+                if self.logger:
+                    self.logger.error(f"Keeping the current presets: {e}")
+                continue
+            self.current = presets
+            if self.logger:
+                self.logger.info(f"Reloaded presets from {self.path}")
+            for callback in self._listeners:
+                callback(presets)
@@ -0,0 +1,145 @@
+import asyncio
+import sys
+import time
+import weakref
+
+from .draft import DraftFormat, DraftOptions
+from .messages import MessageCatalog
+from .metrics import HANDLER_MEMORY, ROOM_STATE_MEMORY, ROOMS, ROOMS_EVICTED
+from .outbox import Outbox
+from .presets import Presets
+from .throttle import Throttle
+
+
+# objects every room refers to but none owns, such as the draft options a
+# `Draft` points back to; counting them per room would count them per draft
+SHARED = (DraftOptions, DraftFormat, Presets, MessageCatalog, Throttle, Outbox)
+
+
+def footprint(obj, seen=None):
+    """
+    Approximate deep size in bytes of plain data: containers, strings,
+    numbers and objects with `__slots__` such as `Draft`. Shared objects
+    (see `SHARED`) are not counted.
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen or isinstance(obj, SHARED):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(footprint(key, seen) + footprint(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(footprint(item, seen) for item in obj)
+    elif hasattr(type(obj), "__slots__"):
+        size += sum(
+            footprint(getattr(obj, slot), seen)
+            for slot in type(obj).__slots__
+            if hasattr(obj, slot)
+        )
+    return size
+
+
+def handler_footprint(handler):
+    """
+    Approximate memory held by one race room handler alone, leaving out
+    what it shares with every other handler (names, pool, logger, ...).
+    """
+    size = sys.getsizeof(handler) + sys.getsizeof(vars(handler))
+    size += footprint(handler.state)
+    size += footprint(handler.data)
+    size += sys.getsizeof(handler.tasks)
+    size += sys.getsizeof(handler.outbox) + footprint(handler.outbox._queue)
+    return size
+
+
+class RoomRegistry(dict):
+    """
+    Per-room state, keyed by race name, with a bounded number of rooms.
+
+    Used as the bot's `state` mapping. Rooms whose handler has finished or
+    disconnected are evicted once they have been idle for `ttl` seconds,
+    and the longest idle ones go first whenever more than `max_rooms` are
+    held. Rooms with a running handler are never evicted.
+    """
+
+    def __init__(self, ttl=3600, max_rooms=1000, logger=None):
+        super().__init__()
+        self.ttl = ttl
+        self.max_rooms = max_rooms
+        self.logger = logger
+        self.handlers = weakref.WeakValueDictionary()
+        self._idle_since = {}
+
+    def attach(self, name, handler):
+        self.handlers[name] = handler
+        self._idle_since.pop(name, None)
+
+    def __delitem__(self, name):
+        super().__delitem__(name)
+        self._idle_since.pop(name, None)
+
+    def sweep(self, active, now=None):
+        """
+        Evict idle rooms, given the names of the rooms with a running
+        handler. Returns the evicted names.
+        """
+        now = time.monotonic() if now is None else now
+        for name in self:
+            if name in active:
+                self._idle_since.pop(name, None)
+            else:
+                self._idle_since.setdefault(name, now)
+
+        idle = sorted(self._idle_since, key=self._idle_since.get)
+        evicted = [name for name in idle if now - self._idle_since[name] >= self.ttl]
+        overflow = len(self) - len(evicted) - self.max_rooms
+        if overflow > 0:
+            evicted += [name for name in idle if name not in evicted][:overflow]
+        for name in evicted:
+            del self[name]
+        if evicted:
+            ROOMS_EVICTED.inc(len(evicted))
+            if self.logger:
+                self.logger.info(f"Evicted state for {len(evicted)} idle rooms")
+        return evicted
+
+    def report(self, active):
+        """
+        Measure room state and running handlers, update the memory gauges
+        and return the measurements.
+        """
+        state_bytes = sum(footprint(state) for state in self.values())
+        handler_bytes = [
+            handler_footprint(handler)
+            for name, handler in list(self.handlers.items())
+            if name in active
+        ]
+        ROOMS.set(len(self))
+        ROOM_STATE_MEMORY.set(state_bytes)
+        HANDLER_MEMORY.set(sum(handler_bytes), stat="total")
+        HANDLER_MEMORY.set(max(handler_bytes, default=0), stat="max")
+        return {
+            "rooms": len(self),
+            "state_bytes": state_bytes,
+            "handlers": len(handler_bytes),
+            "handler_bytes": sum(handler_bytes),
+            "max_handler_bytes": max(handler_bytes, default=0),
+        }
+
+    async def run(self, active, interval=60):
+        """
+        Sweep and measure every `interval` seconds. `active` is the bot's
+        live mapping of race names to handler tasks.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            self.sweep(active)
+            report = self.report(active)
+            if self.logger:
+                self.logger.debug(
+                    f"{report['rooms']} rooms ({report['state_bytes']} bytes of state), "
+                    f"{report['handlers']} handlers ({report['handler_bytes']} bytes, "
+                    f"largest {report['max_handler_bytes']})"
+                )
@@ -0,0 +1,29 @@
+import hashlib
+import random
+import string
+
+
+def generate_seed_name(rng):
+    """
+    Return a random 18 digit seed name drawn from `rng`.
+    """
+    return rng.choice("123456789") + "".join(rng.choice(string.digits) for _ in range(17))
+
+
+def full_permalink(permalink, seed_name):
+    return f"{permalink}#{seed_name}"
+
+
+def compute_hash(seed_name, permalink, version, names):
+    """
+    Return the three word hash the randomizer shows for a seed.
+
+    `permalink` is the settings permalink without the seed name.
+    """
+    current_hash = hashlib.md5()
+    current_hash.update(str(seed_name).encode("ASCII"))
+    current_hash.update(full_permalink(permalink, seed_name).encode("ASCII"))
+    current_hash.update(version.encode("ASCII"))
+    hash_random = random.Random()
+    hash_random.seed(current_hash.digest())
+    return " ".join(hash_random.choice(names) for _ in range(3))
@@ -0,0 +1,29 @@
+import bisect
+import hashlib
+
+
+def _position(key):
+    return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+
+class HashRing:
+    """
+    Consistent hash ring mapping race room names to worker shards.
+
+    Each shard owns `replicas` points on the ring, so rooms spread evenly
+    and changing the number of shards only moves the rooms next to the
+    points that were added or removed.
+    """
+
+    def __init__(self, shards, replicas=160):
+        points = sorted(
+            (_position(f"{shard}:{replica}"), shard)
+            for shard in shards
+            for replica in range(replicas)
+        )
+        self._positions = [position for position, _ in points]
+        self._shards = [shard for _, shard in points]
+
+    def shard_for(self, key):
+        index = bisect.bisect(self._positions, _position(key)) % len(self._positions)
+        return self._shards[index]
@@ -0,0 +1,159 @@
+import asyncio
+import hashlib
+import os
+import shlex
+import shutil
+import tempfile
+
+from .names import commit_of
+
+
+class SpoilerLogError(Exception):
+    """
+    Raised when the generator command fails to produce a spoiler log.
+    """
+
+
+class ArtifactStore:
+    """
+    Content-addressed directory of spoiler logs.
+
+    Each log is stored under the SHA-256 of its (version, permalink, seed),
+    so a seed's log is generated once and every later request is a lookup.
+    `url_base` is the public URL the directory is served from, which is
+    what gets posted in race rooms.
+    """
+
+    def __init__(self, root, url_base):
+        if not url_base:
+            raise ValueError("A public URL for the spoiler log directory is required")
+        self.root = root
+        self.url_base = url_base
+
+    @staticmethod
+    def key(version, permalink, seed):
+        return hashlib.sha256("\0".join((version, permalink, seed)).encode("utf-8")).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.root, key[:2], f"{key}.txt")
+
+    def url(self, key):
+        return f"{self.url_base.rstrip('/')}/{key[:2]}/{key}.txt"
+
+    def has(self, key):
+        return os.path.exists(self.path(key))
+
+    def put(self, key, source):
+        """
+        Move the file at `source` into the store under `key`.
+        """
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        shutil.move(source, tmp_path)
+        os.replace(tmp_path, path)
+
+
+class SpoilerLogService:
+    """
+    Generates spoiler logs by running an external command.
+
+    `command` is a template for the randomizer command line, formatted with
+    `version`, `commit`, `permalink`, `seed` and `output`; it must write the
+    spoiler log to `output`. At most `max_workers` generator processes run
+    at once, and concurrent requests for the same seed share one run.
+    """
+
+    def __init__(self, command, store, max_workers=2, timeout=600, logger=None):
+        self.command = command
+        self.store = store
+        self.timeout = timeout
+        self.logger = logger
+        self._semaphore = asyncio.Semaphore(max_workers)
+        self._pending = {}
+
+    def lookup(self, version, permalink, seed):
+        """
+        Return the URL of an already generated log, or None.
+        """
+        key = self.store.key(version, permalink, seed)
+        return self.store.url(key) if self.store.has(key) else None
+
+    def generating(self, version, permalink, seed):
+        return self.store.key(version, permalink, seed) in self._pending
+
+    def submit(self, version, permalink, seed):
+        """
+        Start generating the spoiler log for this seed unless it is stored or
+        already being generated, and return a future of its URL.
+        """
+        key = self.store.key(version, permalink, seed)
+        if self.store.has(key):
+            future = asyncio.get_event_loop().create_future()
+            future.set_result(self.store.url(key))
+            return future
+        if key not in self._pending:
+            self._pending[key] = asyncio.ensure_future(self._generate(key, version, permalink, seed))
+            self._pending[key].add_done_callback(lambda _: self._pending.pop(key, None))
+        return self._pending[key]
+
+    async def generate(self, version, permalink, seed):
+        """
+        Return the URL of the spoiler log for this seed, generating it first
+        if it is not stored yet.
+        """
+        return await asyncio.shield(self.submit(version, permalink, seed))
+
+    async def _generate(self, key, version, permalink, seed):
+        async with self._semaphore:
+            workdir = tempfile.mkdtemp(prefix="randobot-spoiler-")
+            try:
+                output = os.path.join(workdir, "spoiler.txt")
+                args = [
+                    arg.format(
+                        version=version,
+                        commit=commit_of(version),
+                        permalink=permalink,
+                        seed=seed,
+                        output=output,
+                    )
+                    for arg in shlex.split(self.command)
+                ]
+                process = await asyncio.create_subprocess_exec(
+                    *args,
+                    cwd=workdir,
+                    stdout=asyncio.subprocess.DEVNULL,
+                    stderr=asyncio.subprocess.PIPE,
+                )
+                try:
+                    _, stderr = await asyncio.wait_for(process.communicate(), self.timeout)
+                except asyncio.TimeoutError:
+                    await self._kill(process)
+                    raise SpoilerLogError(f"Spoiler log generation timed out after {self.timeout}s")
+                except asyncio.CancelledError:
+                    # do not leave the generator running on shutdown
+                    await self._kill(process)
+                    raise
+                if process.returncode != 0 or not os.path.exists(output):
+                    if self.logger:
+                        self.logger.error(f"Spoiler log generator failed: {stderr.decode(errors='replace')}")
+                    raise SpoilerLogError(f"Spoiler log generator exited with {process.returncode}")
+                await asyncio.get_event_loop().run_in_executor(None, self.store.put, key, output)
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+        return self.store.url(key)
+
+    @staticmethod
+    async def _kill(process):
+        if process.returncode is None:
+            process.kill()
+        await process.wait()
+
+    async def close(self):
+        """
+        Stop every generator still running.
+        """
+        pending = list(self._pending.values())
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .draft import Draft
+from .presets import PresetWatcher
+
+
+def encode_state(state):
+    data = dict(state)
+    if isinstance(data.get("draft"), Draft):
+        draft = data["draft"]
+        # bans and picks are indexes into the options, so keep their names
+        data["draft"] = {"__draft__": list(draft.to_state()), "options": list(draft.options.names)}
+    return json.dumps(data, separators=(",", ":"))
+
+
+def decode_state(text, draft_options):
+    data = json.loads(text)
+    draft = data.get("draft")
+    if isinstance(draft, dict) and "__draft__" in draft:
+        data["draft"] = Draft.from_state(tuple(draft["__draft__"]), draft_options, draft.get("options"))
+    return data
+
+
+class StateStore:
+    """
+    SQLite store of race room handler state, keyed by race name.
+
+    Handlers mark their state dirty after each command. A background task
+    encodes the dirty rooms and writes them in a single transaction on a
+    dedicated thread, at most once every `flush_interval` seconds.
+    """
+
+    def __init__(self, path, presets=None, flush_interval=1.0, logger=None):
+        self.path = path
+        # restored drafts use the draft options current when they are read
+        self.presets = presets or PresetWatcher()
+        self.flush_interval = flush_interval
+        self.logger = logger
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._dirty = {}
+        self._deleted = set()
+        self._wakeup = None
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS rooms ("
+            "name TEXT PRIMARY KEY, state TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def load_all(self):
+        """
+        Read the state of every stored room in one query.
+        """
+        states = {}
+        for name, text in self._db.execute("SELECT name, state FROM rooms"):
+            try:
+                states[name] = decode_state(text, self.presets.current.draft)
+            except (ValueError, TypeError):
+                if self.logger:
+                    self.logger.warning(f"Discarding unreadable stored state for {name}")
+        return states
+
+    def load(self, name):
+        """
+        Read the state of one room, or None if it is not stored.
+        """
+        row = self._db.execute("SELECT state FROM rooms WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return None
+        try:
+            return decode_state(row[0], self.presets.current.draft)
+        except (ValueError, TypeError):
+            return None
+
+    async def restore(self, name):
+        """
+        Read the state of one room on the store's thread, see `load`.
+        """
+        return await asyncio.get_event_loop().run_in_executor(self._executor, self.load, name)
+
+    def save(self, name, state):
+        self._deleted.discard(name)
+        self._dirty[name] = state
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def delete(self, name):
+        self._dirty.pop(name, None)
+        self._deleted.add(name)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run(self):
+        self._wakeup = asyncio.Event()
+        loop = asyncio.get_event_loop()
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            try:
+                await loop.run_in_executor(self._executor, self._write, *self._take())
+            except sqlite3.Error:
+                if self.logger:
+                    self.logger.error("Failed to write room state.", exc_info=True)
+            await asyncio.sleep(self.flush_interval)
+
+    def close(self):
+        """
+        Write anything still pending and close the database.
+        """
+        self._executor.shutdown(wait=True)
+        self._write(*self._take())
+        self._db.close()
+
+    def _take(self):
+        now = time.time()
+        rows = []
+        for name, state in self._dirty.items():
+            try:
+                rows.append((name, encode_state(state), now))
+            except (TypeError, ValueError):
+                # one unserializable room must not stop the others being saved
+                if self.logger:
+                    self.logger.error(f"Could not encode the state of {name}, not saving it.", exc_info=True)
+        deleted = [(name,) for name in self._deleted]
+        self._dirty = {}
+        self._deleted = set()
+        return rows, deleted
+
+    def _write(self, rows, deleted):
+        if not rows and not deleted:
+            return
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO rooms (name, state, updated_at) VALUES (?, ?, ?)", rows
+            )
+            self._db.executemany("DELETE FROM rooms WHERE name = ?", deleted)
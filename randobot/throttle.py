@@ -0,0 +1,103 @@
+import time
+from collections import namedtuple
+
+
+# `burst` commands at once, refilled evenly over `seconds`
+Limit = namedtuple("Limit", ("burst", "seconds"))
+
+ALLOW = "allow"
+REPLY = "reply"
+DROP = "drop"
+
+
+def parse_limits(data):
+    """
+    Parse the `throttle` section of the preset file: a mapping of command
+    names (or "default") to `{"user": [burst, seconds], "room": [burst,
+    seconds]}`. Returns {command: (user limit, room limit)}, either of
+    which may be None.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("'throttle' must map commands to limits")
+    limits = {}
+    for command, scopes in data.items():
+        if not isinstance(scopes, dict) or not set(scopes) <= {"user", "room"}:
+            raise ValueError(f"Throttle for {command!r} must have 'user' and/or 'room' limits")
+        parsed = []
+        for scope in ("user", "room"):
+            value = scopes.get(scope)
+            if value is None:
+                parsed.append(None)
+                continue
+            if (not isinstance(value, (list, tuple)) or len(value) != 2
+                    or not all(isinstance(n, (int, float)) and n > 0 for n in value)):
+                raise ValueError(f"Throttle {scope} limit for {command!r} must be [burst, seconds]")
+            parsed.append(Limit(*value))
+        limits[command.lower().lstrip("!")] = tuple(parsed)
+    return limits
+
+
+class Bucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, limit, now):
+        self.tokens = limit.burst
+        self.updated = now
+
+    def refill(self, limit, now):
+        rate = limit.burst / limit.seconds
+        self.tokens = min(limit.burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        return self.tokens
+
+
+class Throttle:
+    """
+    Token buckets limiting commands in one race room, per user and for the
+    room as a whole.
+
+    A rejected command gets one reply, telling the user to slow down, and
+    is then dropped silently until that user is allowed the command again.
+    """
+
+    def __init__(self, max_buckets=256):
+        self.max_buckets = max_buckets
+        self._buckets = {}
+        self._warned = set()
+
+    def check(self, limits, command, user, now=None):
+        """
+        Return ALLOW, REPLY or DROP for `user` running `command`, taking a
+        token from each bucket if allowed.
+        """
+        now = time.monotonic() if now is None else now
+        user_limit, room_limit = limits.get(command) or limits.get("default") or (None, None)
+        buckets = []
+        if user_limit is not None:
+            buckets.append((self._bucket(("user", user, command), user_limit, now), user_limit))
+        if room_limit is not None:
+            buckets.append((self._bucket(("room", command), room_limit, now), room_limit))
+        if all(bucket.refill(limit, now) >= 1 for bucket, limit in buckets):
+            for bucket, _ in buckets:
+                bucket.tokens -= 1
+            self._warned.discard((user, command))
+            return ALLOW
+        if (user, command) in self._warned:
+            return DROP
+        self._warned.add((user, command))
+        return REPLY
+
+    def _bucket(self, key, limit, now):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_buckets:
+                self._prune(now)
+            bucket = self._buckets[key] = Bucket(limit, now)
+        return bucket
+
+    def _prune(self, now):
+        # buckets untouched for an hour have long refilled, same as new ones
+        self._buckets = {
+            key: bucket for key, bucket in self._buckets.items()
+            if now - bucket.updated < 3600
+        }
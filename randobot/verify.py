@@ -0,0 +1,147 @@
+import argparse
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from .names import NamesProvider, NamesUnavailable, commit_of
+from .seed import compute_hash
+
+
+FIELDS = ("seed", "permalink", "version", "hash")
+
+_names = {}
+
+
+def read_rows(path):
+    """
+    Read (seed, permalink, version, hash) rows from a CSV file with a header
+    line or from a JSONL file. The seed may instead be given as part of the
+    permalink, after a `#`.
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.endswith(".jsonl") or path.endswith(".json"):
+            records = [json.loads(line) for line in f if line.strip()]
+        else:
+            records = list(csv.DictReader(f))
+    rows = []
+    for record in records:
+        permalink, _, seed = (record.get("permalink") or "").partition("#")
+        rows.append((
+            record.get("seed") or seed,
+            permalink,
+            record.get("version") or "",
+            " ".join((record.get("hash") or "").split()),
+        ))
+    return rows
+
+
+def _init_worker(names):
+    _names.update(names)
+
+
+def _verify_chunk(chunk):
+    results = []
+    for index, (seed, permalink, version, expected) in chunk:
+        names = _names.get(commit_of(version))
+        try:
+            actual = " ".join(compute_hash(seed, permalink, version, names).split())
+        except UnicodeEncodeError as e:
+            # the randomizer only hashes ASCII, so this row cannot be checked
+            results.append((index, None, str(e)))
+            continue
+        results.append((index, actual == expected, actual))
+    return results
+
+
+def verify(rows, names, workers=None, chunk_size=2000):
+    """
+    Recompute the hash of every row across a pool of processes.
+
+    `names` maps each commit to its names list; each worker receives it once.
+    Returns (index, matches, actual hash) tuples in row order, with
+    `matches` None and the error instead of a hash for rows whose hash
+    cannot be computed.
+    """
+    indexed = list(enumerate(rows))
+    chunks = [indexed[i:i + chunk_size] for i in range(0, len(indexed), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(names,)) as executor:
+        results = [result for chunk in executor.map(_verify_chunk, chunks) for result in chunk]
+    return results
+
+
+def check(rows, provider, workers=None, quiet=False):
+    """
+    Verify `rows`, loading names lists from `provider`, print a line for
+    every row that fails and a summary, and return the exit status: 1 for
+    rows that do not match, 2 if the only problem is rows that could not
+    be checked.
+    """
+    names = {}
+    unavailable = {}
+    invalid = set()
+    unverifiable = set()
+    for index, (seed, permalink, version, expected) in enumerate(rows):
+        if not seed or not permalink or "_" not in version:
+            invalid.add(index)
+            continue
+        commit = commit_of(version)
+        if commit not in names and commit not in unavailable:
+            try:
+                names[commit] = provider.load(commit)
+            except NamesUnavailable as e:
+                print(e, file=sys.stderr)
+                unavailable[commit] = e
+        if commit in unavailable:
+            unverifiable.add(index)
+
+    skipped = invalid | unverifiable
+    valid = [row for index, row in enumerate(rows) if index not in skipped]
+    valid_index = [index for index in range(len(rows)) if index not in skipped]
+    mismatches = len(invalid)
+    for index in sorted(skipped):
+        if quiet:
+            continue
+        if index in invalid:
+            print(f"row {index + 1}: missing seed, permalink or version")
+        else:
+            print(f"row {index + 1}: could not load the names list for {rows[index][2]}")
+    for position, matches, actual in verify(valid, names, workers=workers):
+        if matches:
+            continue
+        index = valid_index[position]
+        seed, permalink, version, expected = rows[index]
+        if matches is None:
+            unverifiable.add(index)
+            if not quiet:
+                print(f"row {index + 1}: could not compute the hash: {actual}")
+            continue
+        mismatches += 1
+        if not quiet:
+            print(f"row {index + 1}: {version} {permalink}#{seed} expected '{expected}', got '{actual}'")
+
+    summary = f"{len(rows) - mismatches - len(unverifiable)}/{len(rows)} rows verified"
+    if unverifiable:
+        summary += f", {len(unverifiable)} could not be checked"
+    print(summary)
+    return 1 if mismatches else 2 if unverifiable else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check that seeds, permalinks and versions produce the announced hashes",
+    )
+    parser.add_argument("file", type=str, help="CSV (seed,permalink,version,hash) or JSONL file")
+    parser.add_argument("--workers", "-j", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--cache-dir", type=str, help="directory for cached names lists")
+    parser.add_argument("--quiet", "-q", action="store_true", help="only print the summary")
+
+    args = parser.parse_args()
+
+    rows = read_rows(args.file)
+    sys.exit(check(rows, NamesProvider(cache_dir=args.cache_dir), workers=args.workers, quiet=args.quiet))
+
+
+if __name__ == "__main__":
+    main()
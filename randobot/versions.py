@@ -0,0 +1,156 @@
+import asyncio
+import json
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+
+
+GITHUB_API = "https://api.github.com"
+REPOSITORY = "ssrando/ssrando"
+
+FULL_VERSION_RE = re.compile(r"^[\w.\-]+_[0-9a-fA-F]{7,40}$")
+REF_RE = re.compile(r"^[\w.\-]+$")
+
+
+def canonical_version(version):
+    """
+    Spell a `<version>_<commit>` string the one way it is rolled with:
+    without a `v` before the version number, as `!version` has always
+    taken it. The version is part of the seed hash, so the same build
+    must not be rolled under two names.
+    """
+    if version[:1] == "v" and version[1:2].isdigit():
+        return version[1:]
+    return version
+
+
+class VersionUnknown(Exception):
+    """
+    Raised when a version name cannot be resolved to a commit.
+    """
+
+
+class VersionResolver:
+    """
+    Resolves version names to the `<version>_<commit>` form used for rolls.
+
+    Full `<version>_<commit>` strings and the short names in `aliases` are
+    resolved locally. `latest` and release tags are looked up on the GitHub
+    API in a worker thread; results are cached for `ttl` seconds and then
+    revalidated with the ETag of the previous response, which does not
+    count against the rate limit when nothing changed.
+    """
+
+    def __init__(self, aliases=None, api_url=GITHUB_API, repository=REPOSITORY,
+                 token=None, ttl=3600, timeout=10, logger=None):
+        self.aliases = {name.lower(): version for name, version in (aliases or {}).items()}
+        self.api_url = api_url.rstrip("/")
+        self.repository = repository
+        self.token = token
+        self.ttl = ttl
+        self.timeout = timeout
+        self.logger = logger
+        self._resolved = {}
+        self._responses = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def set_aliases(self, aliases):
+        self.aliases = {name.lower(): version for name, version in aliases.items()}
+
+    def lookup(self, name):
+        """
+        Resolve `name` without any network access.
+
+        Returns the version, or None if it has to be looked up with
+        `resolve`. Expired cache entries are still returned, and refreshed
+        in the background.
+        """
+        key = name.lower()
+        if FULL_VERSION_RE.match(name):
+            return canonical_version(name)
+        if key in self.aliases:
+            return self.aliases[key]
+        entry = self._resolved.get(key)
+        if entry is None:
+            return None
+        version, expires = entry
+        if expires < time.monotonic():
+            self.refresh(name)
+        return version
+
+    async def resolve(self, name):
+        """
+        Resolve `name`, looking it up on GitHub if it is not cached.
+        """
+        version = self.lookup(name)
+        if version is not None:
+            return version
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, self._resolve, name)
+
+    def refresh(self, name):
+        """
+        Revalidate a cached name in the background.
+        """
+        key = name.lower()
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+
+        def done(future):
+            self._refreshing.discard(key)
+            if future.exception() is not None and self.logger:
+                self.logger.warning(f"Could not refresh version {name}: {future.exception()}")
+
+        loop = asyncio.get_event_loop()
+        loop.run_in_executor(None, self._resolve, name).add_done_callback(done)
+
+    def _resolve(self, name):
+        if not REF_RE.match(name):
+            raise VersionUnknown(f"Invalid version {name!r}")
+        if name.lower() == "latest":
+            tag = self._get(f"/repos/{self.repository}/releases/latest", "application/vnd.github+json")
+            ref = json.loads(tag)["tag_name"]
+        else:
+            ref = name
+        try:
+            sha = self._get(f"/repos/{self.repository}/commits/{ref}", "application/vnd.github.sha")
+        except VersionUnknown:
+            if ref.startswith("v"):
+                raise
+            ref = f"v{ref}"
+            sha = self._get(f"/repos/{self.repository}/commits/{ref}", "application/vnd.github.sha")
+        version = canonical_version(f"{ref}_{sha.strip()[:7]}")
+        with self._lock:
+            self._resolved[name.lower()] = (version, time.monotonic() + self.ttl)
+        return version
+
+    def _get(self, path, accept):
+        """
+        GET an API path, revalidating any earlier response with its ETag.
+        """
+        url = self.api_url + path
+        with self._lock:
+            cached = self._responses.get(url)
+        request = urllib.request.Request(url, headers={"Accept": accept, "User-Agent": "ss-rando-bot"})
+        if self.token:
+            request.add_header("Authorization", f"token {self.token}")
+        if cached is not None:
+            request.add_header("If-None-Match", cached[0])
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                body = response.read().decode("utf-8")
+                etag = response.headers.get("ETag")
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and cached is not None:
+                return cached[1]
+            if e.code in (404, 422):
+                raise VersionUnknown(f"{path} not found") from e
+            raise
+        if etag:
+            with self._lock:
+                self._responses[url] = (etag, body)
+        return body
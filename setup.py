@@ -22,9 +22,15 @@ setup(
         'PyGithub>=1.53'
     ],
     packages=find_packages(),
+    package_data={'randobot': ['presets.json', 'messages.json']},
     entry_points={
         'console_scripts': [
             'randobot=randobot:main',
+            'randobot-preroll=randobot.preroll:main',
+            'randobot-verify=randobot.verify:main',
+            'randobot-launch=randobot.launcher:main',
+            'randobot-loadtest=randobot.loadtest:main',
+            'randobot-history=randobot.history:main',
         ],
     },
 )
\ No newline at end of file
@@ -0,0 +1,95 @@
+from randobot.draft import DEFAULT_FORMATS, Draft, DraftFormat, DraftOptions, parse_formats
+
+
+OPTIONS = {name: "IQwAACADspoBUgAAAAAAABCK2CA=" for name in ("Alpha", "Bravo", "Charlie", "Delta", "Echo")}
+FORMATS = parse_formats(dict(DEFAULT_FORMATS, bo3={
+    "label": "Best of 3",
+    "games": [["high ban", "low pick"], ["low ban", "high pick"], ["high pick"]],
+}))
+
+
+def guided(format_name="1v1", game=1):
+    draft = Draft(DraftOptions(OPTIONS, formats=FORMATS))
+    draft.start_guide(FORMATS[format_name], "High", "Low", game)
+    return draft
+
+
+def test_format_tables():
+    bo3 = FORMATS["bo3"]
+    assert bo3.games == 3
+    assert bo3.starts == (0, 2, 4)
+    assert bo3.done == 5
+    # each game ends the draft
+    assert bo3.following == (1, 5, 3, 5, 5, 5)
+    assert bo3.actions[-1] is None and bo3.roles[-1] is None
+
+
+def test_invalid_formats():
+    for games in ([], [[]], [["middle ban"]], [["high veto"]]):
+        try:
+            DraftFormat("bad", "Bad", games)
+        except ValueError:
+            continue
+        raise AssertionError(f"{games!r} was accepted")
+
+
+def test_guided_1v1_order():
+    draft = guided()
+    assert draft.guide_status() == ("draft_next_ban", "Low")
+    assert draft.ban("alpha") == (("draft_banned", "draft_prompt_pick"), {"option": "Alpha", "player": "High"})
+    assert draft.pick("bravo")[0] == ("draft_picked", "draft_prompt_ban")
+    assert draft.ban("charlie")[0] == ("draft_banned", "draft_prompt_pick")
+    assert draft.pick("delta")[0] == ("draft_picked", "draft_prompt_roll")
+    assert draft.guide_status() == ("draft_next_roll", None)
+    assert draft.banned == ["Alpha", "Charlie"]
+    assert draft.picked == ["Bravo", "Delta"]
+
+
+def test_wrong_action_and_finished_draft_are_rejected():
+    draft = guided()
+    assert draft.pick("alpha") == ("draft_expect_ban", {})
+    assert draft.picked == []
+    draft.guide_step = FORMATS["1v1"].done
+    assert draft.ban("alpha") == ("draft_guide_done", {})
+
+
+def test_bad_options_do_not_advance_the_guide():
+    draft = guided()
+    assert draft.ban("zulu") == ("draft_ban_unknown", {"option": "zulu"})
+    draft.ban("alpha")
+    draft.pick("bravo")
+    assert draft.ban("bravo") == ("draft_ban_picked", {"option": "Bravo"})
+    assert draft.guide_status() == ("draft_next_ban", "High")
+
+
+def test_later_games_start_at_their_own_step():
+    draft = guided("bo3", game=2)
+    assert draft.guide_status() == ("draft_next_ban", "Low")
+    draft.ban("alpha")
+    assert draft.pick("bravo")[0] == ("draft_picked", "draft_prompt_roll")
+    message, fields = Draft(DraftOptions(OPTIONS, formats=FORMATS)).start_guide(FORMATS["bo3"], "High", "Low", 3)
+    assert message == ("draftguide_on", "draftguide_game", "draftguide_rules", "draft_prompt_pick")
+    assert (fields["game"], fields["games"], fields["player"]) == (3, 3, "High")
+
+
+def test_state_round_trip():
+    draft = guided("bo3")
+    draft.ban("alpha")
+    state = draft.to_state()
+    restored = Draft.from_state(state, draft.options)
+    assert restored.to_state() == state
+    assert restored.guide_format is FORMATS["bo3"]
+
+
+def test_old_state_is_restored_as_1v1():
+    options = DraftOptions(OPTIONS, formats=FORMATS)
+    restored = Draft.from_state((1, 2, False, "High", "Low", 2), options)
+    assert restored.guide_format is FORMATS["1v1"]
+    assert restored.guide_status() == ("draft_next_ban", "High")
+    assert Draft.from_state((0, 0, True, "", "", None), options).guide_status() is None
+
+
+def test_unknown_format_is_restored_unguided():
+    options = DraftOptions(OPTIONS, formats=FORMATS)
+    assert Draft.from_state((0, 0, True, "High", "Low", "gone", 0), options).guide_status() is None
+    assert Draft.from_state((0, 0, True, "High", "Low", "1v1", 99), options).guide_status() is None
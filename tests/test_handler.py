@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import os
+import shutil
+
+import pytest
+
+from randobot.handler import RandoHandler
+from randobot.names import NamesProvider, NamesUnavailable, commit_of
+from randobot.presets import load_presets
+from randobot.store import StateStore
+
+
+NAMES_FIXTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "names.txt")
+
+
+class ChatHandler(RandoHandler):
+    """
+    RandoHandler recording what it would send to the race room.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.sent = []
+        self.saved = 0
+
+    async def send_message(self, message, **kwargs):
+        self.sent.append(message)
+
+    async def set_raceinfo(self, info, *args, **kwargs):
+        pass
+
+    def _save_state(self):
+        self.saved += 1
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop
+    loop.close()
+
+
+@pytest.fixture
+def handler(loop, tmp_path):
+    shutil.copy(NAMES_FIXTURE, tmp_path / f"{commit_of(load_presets().default_version)}.txt")
+    handler = ChatHandler(
+        names=NamesProvider(cache_dir=str(tmp_path)),
+        logger=logging.getLogger("test"),
+        conn=None,
+        state={},
+    )
+    handler.data = {"name": "test/room", "status": {"value": "open"}}
+    loop.run_until_complete(handler.begin())
+    handler.sent.clear()
+    return handler
+
+
+def say(loop, handler, text, monitor=False, user="player"):
+    loop.run_until_complete(handler.chat_message({"message": {
+        "message": text,
+        "is_monitor": monitor,
+        "user": {"id": user, "name": user},
+    }}))
+
+
+def test_uppercase_commands_are_throttled(loop, handler):
+    # the preset file allows two !info per user every 10 seconds
+    for _ in range(4):
+        say(loop, handler, "!INFO")
+    assert len([message for message in handler.sent if message.startswith("No version specified")]) == 2
+    assert handler.sent[2].startswith("Sorry player, you are using !info too often")
+    assert len(handler.sent) == 3
+
+
+def test_uppercase_commands_take_the_state_lock_and_save(loop, handler):
+    locked = []
+    ex_permalink = handler.ex_permalink
+
+    async def check_lock(args, message):
+        locked.append(handler.state_lock.locked())
+        await ex_permalink(args, message)
+
+    handler.ex_permalink = check_lock
+    saved = handler.saved
+    say(loop, handler, "!PERMALINK IQwAACADspoBUgAAAAAAABCK2CA=", monitor=True)
+    assert locked == [True]
+    assert handler.saved == saved + 1
+
+
+class NoNames:
+    async def get(self, commit):
+        raise NamesUnavailable(f"No names for {commit}")
+
+    async def preload(self, commits):
+        pass
+
+
+def test_failed_draft_roll_leaves_the_room_unchanged(loop, handler):
+    handler.names = NoNames()
+    say(loop, handler, "!draft", monitor=True)
+    permalink = handler.state["permalink"]
+    handler.sent.clear()
+    say(loop, handler, "!rollseed", monitor=True)
+    assert handler.state["permalink"] == permalink
+    assert not handler.state.get("permalink_available")
+    assert not any(message.startswith("Selected mode") for message in handler.sent)
+    assert handler.sent[-1].startswith("Unable to load the hash names")
+
+
+def test_draft_roll_announces_the_selected_mode(loop, handler):
+    say(loop, handler, "!draft", monitor=True)
+    say(loop, handler, "!rollseed", monitor=True)
+    assert any(message.startswith("Selected mode") for message in handler.sent)
+    assert handler.state["permalink_available"]
+
+
+def test_evicted_room_state_is_restored_on_begin(loop, tmp_path):
+    store = StateStore(str(tmp_path / "state.sqlite3"))
+    store.save("test/room", {"intro_sent": True, "permalink": "stored", "locked": True})
+    handler = ChatHandler(
+        names=NamesProvider(cache_dir=str(tmp_path)),
+        logger=logging.getLogger("test"),
+        conn=None,
+        state={},
+        store=store,
+    )
+    handler.data = {"name": "test/room", "status": {"value": "open"}}
+    store._write(*store._take())
+    loop.run_until_complete(handler.begin())
+    assert handler.state["permalink"] == "stored"
+    assert handler.state["locked"]
+    assert handler.sent == []
+    store.close()
+
+
+def message(text, monitor, user):
+    return {"message": {"message": text, "is_monitor": monitor, "user": {"id": user, "name": user}}}
+
+
+@pytest.mark.parametrize("monitor_first", [True, False])
+def test_locked_roll_checks_every_caller(loop, handler, monitor_first):
+    handler.state["locked"] = True
+    calls = [message("!rollseed", True, "monitor"), message("!rollseed", False, "player")]
+    if not monitor_first:
+        calls.reverse()
+    loop.run_until_complete(asyncio.gather(*(handler.chat_message(call) for call in calls)))
+    assert handler.state["permalink_available"]
+    assert len([sent for sent in handler.sent if sent.startswith("Seed rolling is locked")]) == 1
+
+
+def test_garbage_permalinks_are_rejected(loop, handler):
+    permalink = handler.state["permalink"]
+    say(loop, handler, "!permalink nope")
+    assert handler.state["permalink"] == permalink
+    assert handler.sent == [handler.messages.render("invalid_permalink")]
@@ -0,0 +1,76 @@
+import asyncio
+import threading
+
+from randobot.history import BloomFilter, SeedHistory, seed_key
+
+
+def test_bloom_filter_contains_added_keys():
+    bloom = BloomFilter(capacity=1000, error_rate=1e-3)
+    keys = [seed_key("1.0_abc", "perma", str(n)) for n in range(500)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    false_positives = sum(seed_key("1.0_abc", "perma", f"other{n}") in bloom for n in range(2000))
+    assert false_positives < 20
+
+
+def test_bloom_filter_save_and_load(tmp_path):
+    path = str(tmp_path / "filter.bloom")
+    bloom = BloomFilter(capacity=1000, error_rate=1e-3)
+    bloom.add(b"seed")
+    BloomFilter.save(path, bloom.snapshot(42))
+
+    loaded, mark = BloomFilter.load(path, 1000, 1e-3)
+    assert mark == 42
+    assert loaded.count == 1
+    assert b"seed" in loaded
+    assert b"other" not in loaded
+
+
+def test_bloom_filter_load_rejects_other_sizes(tmp_path):
+    path = str(tmp_path / "filter.bloom")
+    BloomFilter.save(path, BloomFilter(capacity=1000, error_rate=1e-3).snapshot(0))
+    assert BloomFilter.load(path, 2000, 1e-3) is None
+    assert BloomFilter.load(str(tmp_path / "missing.bloom"), 1000, 1e-3) is None
+
+
+def test_seen_and_find_after_writing(tmp_path):
+    history = SeedHistory(str(tmp_path / "history.sqlite3"))
+    history._write([("1.0_abc", "perma", "seed", "A B C", "room/1", 1.0)])
+    assert asyncio.run(history.seen("1.0_abc", "perma", "seed"))
+    assert not asyncio.run(history.seen("1.0_abc", "perma", "other"))
+    assert [row["room"] for row in asyncio.run(history.find(hash="A B C"))] == ["room/1"]
+    history.close()
+
+
+def test_lookups_do_not_wait_for_writes(tmp_path):
+    history = SeedHistory(str(tmp_path / "history.sqlite3"))
+    release = threading.Event()
+    # stands in for a long first indexing pass on the write thread
+    history._executor.submit(release.wait)
+
+    async def lookup():
+        return await asyncio.wait_for(history.seen("1.0_abc", "perma", "seed"), 5)
+
+    try:
+        assert asyncio.run(lookup()) is False
+    finally:
+        release.set()
+    history.close()
+
+
+def test_unwritable_roll_does_not_block_the_others(tmp_path):
+    history = SeedHistory(str(tmp_path / "history.sqlite3"), flush_interval=0, save_interval=60)
+
+    async def run():
+        task = asyncio.ensure_future(history.run())
+        history.record("1.0_abc", "perma", object(), "A B C", "room/1")
+        history.record("1.0_abc", "perma", "good", "D E F", "room/2")
+        await asyncio.sleep(0.3)
+        assert not task.done()
+        task.cancel()
+
+    asyncio.run(run())
+    assert not history._pending
+    assert [row["seed"] for row in asyncio.run(history.find(hash="D E F"))] == ["good"]
+    history.close()
@@ -0,0 +1,23 @@
+import json
+import logging
+
+from randobot.logs import ArchivingFileHandler, AuditFilter, JsonFormatter, audit, audit_logger
+
+
+def test_audit_log_rotation_keeps_every_event(tmp_path):
+    handler = ArchivingFileHandler(str(tmp_path / "audit.jsonl"), 500, encoding="utf-8")
+    handler.addFilter(AuditFilter())
+    handler.setFormatter(JsonFormatter())
+    audit_logger.addHandler(handler)
+    audit_logger.setLevel(logging.INFO)
+    try:
+        for n in range(100):
+            audit("roll", n=n)
+    finally:
+        audit_logger.removeHandler(handler)
+        handler.close()
+
+    files = sorted(tmp_path.iterdir())
+    assert len(files) > 10
+    events = [json.loads(line) for path in files for line in path.read_text(encoding="utf-8").splitlines()]
+    assert sorted(event["n"] for event in events) == list(range(100))
@@ -0,0 +1,50 @@
+import pytest
+
+from randobot.messages import BILINGUAL, ENGLISH, MessageCatalog, MessageError, load_messages
+
+
+CATALOG = {
+    "locales": ["en", "fr"],
+    "messages": {
+        "hello": {"en": "Hello {player}.", "fr": "Bonjour {player}."},
+        "rolling": {"en": "Rolling {{seed}}..."},
+        "prompt": {"en": "Your turn.", "fr": "À toi."},
+    },
+}
+
+
+def test_render_in_each_locale():
+    catalog = MessageCatalog(CATALOG)
+    assert catalog.render("hello", player="A") == "Hello A."
+    assert catalog.render("hello", BILINGUAL, player="A") == "Hello A.\nBonjour A."
+
+
+def test_missing_translations_fall_back_to_the_first_locale():
+    catalog = MessageCatalog(CATALOG)
+    assert catalog.render("rolling", BILINGUAL) == "Rolling {seed}..."
+    # a line is only sent in a locale every part is translated to
+    assert catalog.render(("hello", "rolling"), BILINGUAL, player="A") == "Hello A. Rolling {seed}..."
+    assert catalog.render(("hello", "prompt"), BILINGUAL, player="A") == "Hello A. Your turn.\nBonjour A. À toi."
+
+
+def test_identical_lines_are_sent_once():
+    catalog = MessageCatalog(dict(CATALOG, messages={"ok": {"en": "OK", "fr": "OK"}}))
+    assert catalog.render("ok", BILINGUAL) == "OK"
+    assert catalog.render("ok", ENGLISH) == "OK"
+
+
+@pytest.mark.parametrize("messages", [
+    {"hello": {"fr": "Bonjour"}},
+    {"hello": {"en": "Hello", "de": "Hallo"}},
+    {"hello": {"en": "Hello", "fr": "Bonjour {player}"}},
+    {"hello": {"en": "Hello {0}"}},
+])
+def test_invalid_catalogs(messages):
+    with pytest.raises(MessageError):
+        MessageCatalog(dict(CATALOG, messages=messages))
+
+
+def test_shipped_catalog_loads():
+    catalog = load_messages()
+    assert catalog.locales[0] == "en"
+    assert catalog.render("draft_banned", option="Alpha") == "Banned Alpha."
@@ -0,0 +1,77 @@
+import asyncio
+
+from randobot.outbox import Outbox, merge_raceinfo
+
+
+def send_all(messages, **kwargs):
+    sent = []
+
+    async def send_message(message, **_):
+        sent.append(message)
+
+    async def set_raceinfo(info, **_):
+        pass
+
+    async def run():
+        outbox = Outbox(send_message, set_raceinfo, min_interval=0, **kwargs)
+        for message in messages:
+            outbox.message(message)
+        await outbox.flush()
+        outbox.close()
+
+    asyncio.run(run())
+    return sent
+
+
+def test_queued_messages_are_joined_with_line_breaks():
+    assert send_all(["one", "two", "three"]) == ["one\ntwo\nthree"]
+
+
+def test_joined_messages_stay_under_the_length_limit():
+    assert send_all(["a" * 6, "b" * 6, "c" * 6], max_length=13) == ["aaaaaa\nbbbbbb", "cccccc"]
+
+
+def test_coalescing_can_be_turned_off():
+    assert send_all(["one", "two", "three"], coalesce=False) == ["one", "two", "three"]
+
+
+def set_all(updates):
+    sent = []
+
+    async def send_message(message, **_):
+        pass
+
+    async def set_raceinfo(info, **kwargs):
+        sent.append((info, kwargs))
+
+    async def run():
+        outbox = Outbox(send_message, set_raceinfo, min_interval=0)
+        for info, kwargs in updates:
+            outbox.raceinfo(info, **kwargs)
+        await outbox.flush()
+        outbox.close()
+
+    asyncio.run(run())
+    return sent
+
+
+def test_race_info_additions_are_kept():
+    sent = set_all([("preset", {}), ("hash", {})])
+    assert sent == [("hash | preset", {"overwrite": False, "prefix": True})]
+    sent = set_all([("preset", {"prefix": False}), ("hash", {"prefix": False})])
+    assert sent == [("preset | hash", {"overwrite": False, "prefix": False})]
+
+
+def test_race_info_overwrite_replaces_earlier_updates():
+    sent = set_all([("preset", {}), ("seed", {"overwrite": True}), ("hash", {})])
+    assert sent == [("hash | seed", {"overwrite": True, "prefix": True})]
+
+
+def test_race_info_in_both_directions_is_sent_separately():
+    sent = set_all([("preset", {}), ("hash", {"prefix": False})])
+    assert [info for info, _ in sent] == ["preset", "hash"]
+
+
+def test_addition_to_cleared_race_info_has_no_separator():
+    cleared = ("", {"overwrite": True, "prefix": True})
+    assert merge_raceinfo(cleared, ("hash", {"overwrite": False, "prefix": False})) == ("hash", cleared[1])
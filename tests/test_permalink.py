@@ -0,0 +1,40 @@
+import pytest
+
+from randobot.permalink import InvalidPermalink, Permalink, is_valid, with_setting
+
+
+PERMALINK = "IQwAACADspoBUgAAAAAAABCK2CA="
+
+
+def test_decode_and_encode_round_trip():
+    permalink = Permalink.decode(PERMALINK)
+    assert permalink.encode() == PERMALINK
+    assert Permalink.decode(str(permalink)) == permalink
+
+
+def test_set_changes_only_the_setting():
+    permalink = Permalink.decode(PERMALINK)
+    off = permalink.set("no-spoiler-log", 1)
+    assert off.get("no-spoiler-log") == 1
+    assert off.bits ^ permalink.bits in (0, 1 << 54)
+    assert off.set("no-spoiler-log", permalink.get("no-spoiler-log")) == permalink
+    assert permalink.encode() == PERMALINK
+
+
+def test_with_setting():
+    off = with_setting(PERMALINK, "no-spoiler-log", 1)
+    assert Permalink.decode(off).get("no-spoiler-log") == 1
+    assert with_setting(off, "no-spoiler-log", 1) == off
+
+
+def test_invalid_permalinks():
+    assert is_valid(PERMALINK)
+    for text in ("not base64!", "", "nope", "AAAA", PERMALINK[:8]):
+        assert not is_valid(text)
+        with pytest.raises(InvalidPermalink):
+            Permalink.decode(text)
+
+
+def test_short_permalinks_cannot_hold_settings():
+    with pytest.raises(InvalidPermalink):
+        Permalink(0, 6).get("no-spoiler-log")
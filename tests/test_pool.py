@@ -0,0 +1,37 @@
+import asyncio
+import os
+
+from randobot.names import parse_names
+from randobot.pool import SeedPool
+
+
+NAMES_FIXTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "names.txt")
+
+
+class FixtureNames:
+    def __init__(self):
+        with open(NAMES_FIXTURE, encoding="utf-8") as f:
+            self.names = parse_names(f.read())
+
+    async def get(self, commit):
+        return self.names
+
+
+def test_pop_during_a_refill_pass_is_refilled():
+    config = ("1.0_abc", "IQwAACADspoBUgAAAAAAABCK2CA=")
+    other = ("1.0_abc", "IwUAAAAAwsXwJQAAAAAAgAAAAAA=")
+    pool = SeedPool(FixtureNames(), [config, other], size=3, low_water=1)
+
+    async def run():
+        task = asyncio.ensure_future(pool.run())
+        # pop from `config` while the first pass is busy filling `other`
+        while not pool.pools[other]:
+            await asyncio.sleep(0)
+        pool.pop(*config)
+        pool.pop(*config)
+        await asyncio.sleep(0.1)
+        task.cancel()
+
+    asyncio.run(run())
+    assert len(pool.pools[config]) == 3
+    assert len(pool.pools[other]) == 3
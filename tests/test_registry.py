@@ -0,0 +1,25 @@
+from randobot.draft import Draft
+from randobot.presets import load_presets
+from randobot.registry import RoomRegistry, footprint
+
+
+def drafted_room(options):
+    draft = Draft(options)
+    draft.start_guide(options.formats[options.default_format], "High", "Low")
+    draft.ban(options.names[0])
+    return {"draft": draft, "permalink": "IQwAACADspoBUgAAAAAAABCK2CA=", "locked": False}
+
+
+def test_shared_draft_options_are_not_counted_per_room():
+    options = load_presets().draft
+    room = drafted_room(options)
+    own = footprint(room)
+    assert own < 4096
+
+    one = RoomRegistry()
+    one["a"] = room
+    two = RoomRegistry()
+    two["a"] = drafted_room(options)
+    two["b"] = drafted_room(options)
+    single = one.report({})["state_bytes"]
+    assert abs(two.report({})["state_bytes"] - 2 * single) < 64
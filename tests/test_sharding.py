@@ -0,0 +1,20 @@
+from randobot.sharding import HashRing
+
+
+ROOMS = [f"ss/room-{n}" for n in range(2000)]
+
+
+def test_mapping_is_stable_and_uses_every_shard():
+    ring = HashRing(range(4))
+    shards = [ring.shard_for(room) for room in ROOMS]
+    assert shards == [HashRing(range(4)).shard_for(room) for room in ROOMS]
+    counts = [shards.count(shard) for shard in range(4)]
+    assert min(counts) > len(ROOMS) / 4 * 0.7
+
+
+def test_adding_a_shard_only_moves_rooms_to_it():
+    before = HashRing(range(4))
+    after = HashRing(range(5))
+    moved = [room for room in ROOMS if before.shard_for(room) != after.shard_for(room)]
+    assert all(after.shard_for(room) == 4 for room in moved)
+    assert len(moved) < len(ROOMS) / 5 * 1.3
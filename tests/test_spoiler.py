@@ -0,0 +1,104 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+from randobot.spoiler import ArtifactStore, SpoilerLogError, SpoilerLogService
+
+
+def test_urls_use_the_public_base(tmp_path):
+    store = ArtifactStore(str(tmp_path), url_base="https://example.org/spoilers/")
+    key = store.key("1.0_abc", "perma", "seed")
+    assert store.url(key) == f"https://example.org/spoilers/{key[:2]}/{key}.txt"
+
+
+def test_a_public_base_is_required(tmp_path):
+    with pytest.raises(ValueError):
+        ArtifactStore(str(tmp_path), url_base=None)
+
+
+GENERATOR = """\
+import os, sys, time
+output, mode, count = sys.argv[1:4]
+with open(count, "a") as f:
+    f.write("run\\n")
+if mode == "fail":
+    sys.exit(3)
+if mode == "hang":
+    with open(count + ".pid", "w") as f:
+        f.write(str(os.getpid()))
+    time.sleep(60)
+time.sleep(0.2)
+with open(output, "w") as f:
+    f.write("spoiler log\\n")
+"""
+
+
+def service(tmp_path, mode, **kwargs):
+    generator = tmp_path / "generator.py"
+    generator.write_text(GENERATOR)
+    command = f"{sys.executable} {generator} {{output}} {mode} {tmp_path / 'runs'}"
+    store = ArtifactStore(str(tmp_path / "logs"), url_base="https://example.org/spoilers")
+    return SpoilerLogService(command, store, **kwargs)
+
+
+def runs(tmp_path):
+    path = tmp_path / "runs"
+    return len(path.read_text().splitlines()) if path.exists() else 0
+
+
+def test_concurrent_requests_share_one_run_and_later_ones_hit_the_store(tmp_path):
+    spoilers = service(tmp_path, "ok")
+
+    async def run():
+        urls = await asyncio.gather(*(spoilers.generate("1.0_abc", "perma", "seed") for _ in range(3)))
+        assert not spoilers.generating("1.0_abc", "perma", "seed")
+        return urls, await spoilers.generate("1.0_abc", "perma", "seed")
+
+    urls, cached = asyncio.run(run())
+    key = ArtifactStore.key("1.0_abc", "perma", "seed")
+    assert set(urls) == {cached} == {f"https://example.org/spoilers/{key[:2]}/{key}.txt"}
+    assert spoilers.lookup("1.0_abc", "perma", "seed") == cached
+    assert (tmp_path / "logs" / key[:2] / f"{key}.txt").read_text() == "spoiler log\n"
+    assert runs(tmp_path) == 1
+
+
+def test_generator_failure(tmp_path):
+    spoilers = service(tmp_path, "fail")
+    with pytest.raises(SpoilerLogError):
+        asyncio.run(spoilers.generate("1.0_abc", "perma", "seed"))
+    assert spoilers.lookup("1.0_abc", "perma", "seed") is None
+
+
+def assert_killed(tmp_path):
+    pid = int((tmp_path / "runs.pid").read_text())
+    with pytest.raises(ProcessLookupError):
+        os.kill(pid, 0)
+
+
+def wait_for_start(tmp_path):
+    async def wait():
+        while not (tmp_path / "runs.pid").exists():
+            await asyncio.sleep(0.05)
+    return wait()
+
+
+def test_timed_out_generator_is_killed(tmp_path):
+    spoilers = service(tmp_path, "hang", timeout=1)
+    with pytest.raises(SpoilerLogError):
+        asyncio.run(spoilers.generate("1.0_abc", "perma", "seed"))
+    assert_killed(tmp_path)
+
+
+def test_close_kills_running_generators(tmp_path):
+    spoilers = service(tmp_path, "hang")
+
+    async def run():
+        future = spoilers.submit("1.0_abc", "perma", "seed")
+        await asyncio.wait_for(wait_for_start(tmp_path), 10)
+        await spoilers.close()
+        assert future.cancelled()
+
+    asyncio.run(run())
+    assert_killed(tmp_path)
@@ -0,0 +1,69 @@
+import asyncio
+import logging
+
+from randobot.draft import Draft, DraftOptions
+from randobot.presets import load_presets
+from randobot.store import StateStore, decode_state
+
+
+def test_state_round_trip(tmp_path):
+    presets = load_presets()
+    draft = Draft(presets.draft)
+    draft.ban("open")
+    store = StateStore(str(tmp_path / "state.sqlite3"))
+    store.save("room/1", {"permalink": presets.default_permalink, "draft": draft})
+    store.close()
+
+    state = StateStore(str(tmp_path / "state.sqlite3")).load("room/1")
+    assert state["permalink"] == presets.default_permalink
+    assert state["draft"].banned == ["3D Open"]
+
+
+def test_unencodable_room_does_not_stop_saving(tmp_path):
+    store = StateStore(str(tmp_path / "state.sqlite3"), flush_interval=0, logger=logging.getLogger("test"))
+
+    async def run():
+        task = asyncio.ensure_future(store.run())
+        await asyncio.sleep(0)
+        store.save("room/bad", {"value": object()})
+        store.save("room/good", {"value": 1})
+        await asyncio.sleep(0.2)
+        store.save("room/later", {"value": 2})
+        await asyncio.sleep(0.2)
+        assert not task.done()
+        task.cancel()
+
+    asyncio.run(run())
+    assert store.load("room/good") == {"value": 1}
+    assert store.load("room/later") == {"value": 2}
+    assert store.load("room/bad") is None
+    store.close()
+
+
+def test_draft_follows_its_options_when_they_change(tmp_path):
+    presets = load_presets()
+    names = presets.draft.names
+    draft = Draft(presets.draft)
+    draft.ban(names[0])
+    draft.pick(names[-1])
+    store = StateStore(str(tmp_path / "state.sqlite3"))
+    store.save("room/1", {"draft": draft})
+    store.close()
+
+    # the first option removed and the others reordered
+    changed = DraftOptions({name: presets.draft.options[name] for name in reversed(names[1:])})
+    text = StateStore(str(tmp_path / "state.sqlite3"))._db.execute("SELECT state FROM rooms").fetchone()[0]
+    restored = decode_state(text, changed)["draft"]
+    assert restored.banned == []
+    assert restored.picked == [names[-1]]
+    assert restored.picked_mask == 1
+
+
+def test_restore_reads_on_the_store_thread(tmp_path):
+    store = StateStore(str(tmp_path / "state.sqlite3"))
+    store.save("room/1", {"value": 1})
+    store.close()
+    store = StateStore(str(tmp_path / "state.sqlite3"))
+    assert asyncio.run(store.restore("room/1")) == {"value": 1}
+    assert asyncio.run(store.restore("room/2")) is None
+    store.close()
@@ -0,0 +1,44 @@
+import pytest
+
+from randobot.throttle import ALLOW, DROP, REPLY, Limit, Throttle, parse_limits
+
+
+LIMITS = parse_limits({
+    "!Info": {"user": [2, 10]},
+    "default": {"room": [3, 30]},
+})
+
+
+def test_parse_limits():
+    assert LIMITS == {"info": (Limit(2, 10), None), "default": (None, Limit(3, 30))}
+    for data in ([], {"info": {"user": [2]}}, {"info": {"user": [0, 10]}}, {"info": {"channel": [2, 10]}}):
+        with pytest.raises(ValueError):
+            parse_limits(data)
+
+
+def test_burst_then_one_reply_then_drops():
+    throttle = Throttle()
+    results = [throttle.check(LIMITS, "info", "a", now=0) for _ in range(5)]
+    assert results == [ALLOW, ALLOW, REPLY, DROP, DROP]
+    assert throttle.check(LIMITS, "info", "b", now=0) == ALLOW
+
+
+def test_tokens_refill_over_time():
+    throttle = Throttle()
+    for _ in range(3):
+        throttle.check(LIMITS, "info", "a", now=0)
+    assert throttle.check(LIMITS, "info", "a", now=4) == DROP
+    assert throttle.check(LIMITS, "info", "a", now=5) == ALLOW
+    # allowed again, so the next rejection gets a reply
+    assert throttle.check(LIMITS, "info", "a", now=5) == REPLY
+
+
+def test_room_limits_are_shared():
+    throttle = Throttle()
+    assert [throttle.check(LIMITS, "seed", user, now=0) for user in "abcd"] == [ALLOW, ALLOW, ALLOW, REPLY]
+    assert throttle.check(LIMITS, "seed", "e", now=10) == ALLOW
+
+
+def test_commands_without_limits_are_allowed():
+    throttle = Throttle()
+    assert all(throttle.check({}, "info", "a", now=0) == ALLOW for _ in range(10))
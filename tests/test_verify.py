@@ -0,0 +1,60 @@
+import os
+
+from randobot.names import NamesUnavailable, commit_of, parse_names
+from randobot.presets import load_presets
+from randobot.seed import compute_hash
+from randobot.verify import check
+
+
+NAMES_FIXTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "names.txt")
+
+
+class FixtureNames:
+    """
+    Names provider with the fixture list for one commit and none for the
+    others.
+    """
+
+    def __init__(self, commit):
+        self.commit = commit
+        with open(NAMES_FIXTURE, encoding="utf-8") as f:
+            self.names = parse_names(f.read())
+
+    def load(self, commit):
+        if commit != self.commit:
+            raise NamesUnavailable(f"No names for {commit}")
+        return self.names
+
+
+def test_rows_of_unloadable_versions_do_not_stop_the_batch(capsys):
+    presets = load_presets()
+    version, permalink = presets.default_version, presets.default_permalink
+    provider = FixtureNames(commit_of(version))
+    hash = compute_hash("seed1", permalink, version, provider.names)
+
+    status = check([
+        ("seed1", permalink, version, hash),
+        ("seed2", permalink, "1.0.0_0000000", "A B C"),
+    ], provider, workers=1)
+    out = capsys.readouterr().out
+    assert "1/2 rows verified, 1 could not be checked" in out
+    assert "row 2: could not load the names list" in out
+    assert status == 2
+
+
+def test_rows_that_cannot_be_hashed_do_not_fail_the_chunk(capsys):
+    presets = load_presets()
+    version, permalink = presets.default_version, presets.default_permalink
+    provider = FixtureNames(commit_of(version))
+    hash = compute_hash("seed1", permalink, version, provider.names)
+
+    status = check([
+        ("séed", permalink, version, "A B C"),
+        ("seed1", permalink, version, hash),
+        ("seed2", permalink, version, "A B C"),
+    ], provider, workers=1)
+    out = capsys.readouterr().out
+    assert "row 1: could not compute the hash" in out
+    assert "row 3:" in out
+    assert "1/3 rows verified, 1 could not be checked" in out
+    assert status == 1
@@ -0,0 +1,97 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from randobot.versions import VersionResolver, VersionUnknown
+
+
+SHA = "abcdef1234567890abcdef1234567890abcdef12"
+
+
+class StubGitHub(BaseHTTPRequestHandler):
+    """
+    The two GitHub API endpoints VersionResolver uses, with ETags.
+    """
+
+    routes = {
+        "/repos/ssrando/ssrando/releases/latest": json.dumps({"tag_name": "v2.1.0"}),
+        "/repos/ssrando/ssrando/commits/v2.1.0": SHA,
+        "/repos/ssrando/ssrando/commits/v1.2.0": SHA,
+    }
+
+    def do_GET(self):
+        self.server.requests.append((self.path, self.headers.get("If-None-Match")))
+        body = self.routes.get(self.path)
+        if body is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        etag = f'"{hash(body)}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body.encode("utf-8"))
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def github():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubGitHub)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def resolver(github, **kwargs):
+    return VersionResolver(api_url=f"http://127.0.0.1:{github.server_address[1]}", **kwargs)
+
+
+def test_full_versions_and_aliases_resolve_locally():
+    versions = VersionResolver(aliases={"Default": "v2.0.0_b9f6c8d"}, api_url="http://127.0.0.1:9")
+    assert versions.lookup("1.2.0_3868e57") == "1.2.0_3868e57"
+    assert versions.lookup("v1.2.0_3868e57") == "1.2.0_3868e57"
+    assert versions.lookup("default") == "v2.0.0_b9f6c8d"
+    assert versions.lookup("latest") is None
+
+
+def test_latest_is_resolved_and_cached(github):
+    versions = resolver(github)
+    assert asyncio.run(versions.resolve("latest")) == "2.1.0_abcdef1"
+    requests = len(github.requests)
+    assert versions.lookup("latest") == "2.1.0_abcdef1"
+    assert len(github.requests) == requests
+
+
+def test_revalidation_sends_the_etag(github):
+    versions = resolver(github, ttl=0)
+    assert versions._resolve("latest") == "2.1.0_abcdef1"
+    assert all(etag is None for _, etag in github.requests)
+    github.requests.clear()
+    assert versions._resolve("latest") == "2.1.0_abcdef1"
+    assert github.requests and all(etag is not None for _, etag in github.requests)
+
+
+def test_tags_resolve_to_one_spelling(github):
+    # 1.2.0 is only found as the tag v1.2.0
+    assert resolver(github)._resolve("1.2.0") == "1.2.0_abcdef1"
+    assert resolver(github)._resolve("v1.2.0") == "1.2.0_abcdef1"
+
+
+def test_unknown_versions(github):
+    versions = resolver(github)
+    with pytest.raises(VersionUnknown):
+        versions._resolve("v9.9.9")
+    with pytest.raises(VersionUnknown):
+        versions._resolve("not/a/ref")